@@ -0,0 +1,112 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+
+from django.http import HttpResponse, HttpResponseBadRequest
+
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from moviesproject.routers import pin_to_primary
+from moviesproject.singleflight import AsyncSingleFlight
+
+from . import serializers
+from .omdb_async import AsyncOMDB
+from .views import MovieViewset
+
+
+_create_flight = AsyncSingleFlight()
+
+
+def _json_response(data, status):
+    # The same renderer as the default one of the synchronous views, e.g. orjson with `API_ORJSON`
+    renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+    return HttpResponse(renderer.render(data), content_type=renderer.media_type, status=status)
+
+
+def _save_movie(full_data):
+    read_serializer = serializers.MovieListSerializer(data=full_data)
+    read_serializer.is_valid(raise_exception=True)
+
+    (instance, created), = serializers.get_or_create_movies([read_serializer.validated_data])
+    return serializers.MovieListSerializer(instance).data, created
+
+
+async def _create_movie(title):
+    full_data = await AsyncOMDB.get_movie_by_title(title)
+    return await sync_to_async(_save_movie)(full_data)
+
+
+async def create_movie(request):
+    drf_request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
+
+    try:
+        data = drf_request.data
+    except APIException as exc:
+        # Malformed or unsupported bodies, reported the way DRF's exception handler does
+        detail = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        return _json_response(detail, exc.status_code)
+
+    write_serializer = serializers.MovieCreateSerializer(data=data)
+    if not write_serializer.is_valid():
+        return _json_response(write_serializer.errors, status.HTTP_400_BAD_REQUEST)
+
+    title = write_serializer.data['title']
+
+    try:
+        (data, created), shared = await _create_flight.do(AsyncOMDB._normalize_title(title), _create_movie, title)
+    except asyncio.CancelledError:
+        # An `Exception` before Python 3.8, the client went away and the task is being cancelled
+        raise
+    except Exception:
+        return HttpResponseBadRequest()
+
+    return _json_response(data, status.HTTP_201_CREATED if created and not shared else status.HTTP_200_OK)
+
+
+_movie_list = MovieViewset.as_view({'get': 'list'})
+
+
+async def movie_list_create(request, *args, **kwargs):
+    """
+    Serves `/movies/` awaiting OMDB on creation, listing stays on the synchronous viewset.
+    """
+    if request.method == 'POST':
+        response = await create_movie(request)
+        if status.is_success(response.status_code):
+            pin_to_primary(response)
+        return response
+
+    response = await sync_to_async(_movie_list)(request, *args, **kwargs)
+    if response.streaming and not getattr(response, 'is_async', False):
+        await _stream_in_thread(response)
+
+    return response
+
+
+async def _stream_in_thread(response):
+    """
+    Reads the content of a streaming response, such as the NDJSON export, outside of the event loop.
+
+    The content queries the database as it is iterated, which is not allowed in the event loop.
+    """
+    chunks = iter(response.streaming_content)
+
+    async def content():
+        while True:
+            chunk = await sync_to_async(next)(chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+
+    if hasattr(response, 'is_async'):
+        response.streaming_content = content()
+    else:
+        # Before Django 4.2 the ASGI handler iterates the content synchronously, it is read up front
+        response.streaming_content = await sync_to_async(list)(chunks)
+
+
+# `csrf_exempt` wraps coroutine functions in a synchronous view before Django 5.0
+movie_list_create.csrf_exempt = True
@@ -0,0 +1,107 @@
+"""
+Synthetic movies and comments for the `benchmark_api` command.
+
+Movies are copies of the OMDB payloads shipped with the benchmarks, comments
+are spread over `DAYS` days before `end` so that top movies windows of any
+length find some. The same seed always generates the same dataset.
+"""
+import collections
+import datetime
+import json
+import os
+import random
+
+from django.db import transaction
+
+from moviesapp import models, serializers
+from moviesapp.omdb import OMDB
+
+
+PAYLOADS_PATH = os.path.join(os.path.dirname(__file__), 'omdb_payloads.json')
+
+BATCH_SIZE = 1000
+DAYS = 30
+
+WORDS = (
+    'great', 'boring', 'masterpiece', 'plot', 'acting', 'soundtrack', 'villain', 'ending', 'sequel', 'classic',
+    'overrated', 'underrated', 'director', 'scene', 'effects', 'dialogue', 'funny', 'dark', 'slow', 'brilliant',
+)
+
+
+def load_movie_payloads():
+    """
+    Returns validated movie data for every OMDB payload shipped with the benchmarks.
+    """
+    with open(PAYLOADS_PATH, encoding='utf-8') as payloads_file:
+        payloads = json.load(payloads_file)
+
+    movies = []
+    for payload in payloads:
+        serializer = serializers.MovieListSerializer(data=OMDB._parse_response('', payload))
+        serializer.is_valid(raise_exception=True)
+        movies.append(serializer.validated_data)
+
+    return movies
+
+
+def create_movies(count, rng):
+    templates = load_movie_payloads()
+    movie_ids = []
+
+    for start in range(0, count, BATCH_SIZE):
+        batch = [
+            dict(
+                rng.choice(templates),
+                title='{} {}'.format(rng.choice(WORDS).title(), i),
+                imdb_id='tt9{:08d}'.format(i)
+            )
+            for i in range(start, min(start + BATCH_SIZE, count))
+        ]
+        movie_ids.extend(movie.id for movie in serializers.create_movies(batch))
+
+    return movie_ids
+
+
+def create_comments(count, movie_ids, end, rng):
+    start = end - datetime.timedelta(days=DAYS)
+    span = (end - start).total_seconds()
+
+    counts = collections.Counter()
+
+    for offset in range(0, count, BATCH_SIZE):
+        comments = []
+        for _ in range(min(BATCH_SIZE, count - offset)):
+            comments.append(models.Comment(
+                movie_id=rng.choice(movie_ids),
+                content=' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))),
+            ))
+
+        # `created_at` is set to the current time on insert, it is spread over the days afterwards
+        models.Comment.objects.bulk_create(comments)
+        for comment in comments:
+            comment.created_at = start + datetime.timedelta(seconds=rng.uniform(0, span))
+            counts[comment.movie_id, models.CommentCount.bucket_start(comment.created_at)] += 1
+        models.Comment.objects.bulk_update(comments, ['created_at'])
+
+    models.CommentCount.objects.bulk_create(
+        (models.CommentCount(movie_id=movie_id, bucket=bucket, count=bucket_count)
+         for (movie_id, bucket), bucket_count in counts.items()),
+        batch_size=BATCH_SIZE
+    )
+
+    # Bulk inserts skip `Comment.save`, the movie counters are filled in afterwards
+    for start in range(0, len(movie_ids), BATCH_SIZE):
+        models.Movie.reconcile_comment_counters(movie_ids[start:start + BATCH_SIZE])
+
+
+def generate(movies, comments, end, seed=0):
+    """
+    Creates `movies` movies with their ratings and `comments` comments, returns the movie ids.
+    """
+    rng = random.Random(seed)
+
+    with transaction.atomic():
+        movie_ids = create_movies(movies, rng)
+        create_comments(comments, movie_ids, end, rng)
+
+    return movie_ids
@@ -0,0 +1,56 @@
+"""
+OMDB response normalization as implemented before the single-pass normalizer,
+kept as the baseline of the `benchmark_omdb_normalizer` command.
+"""
+import re
+import collections.abc
+
+from dateutil.parser import parse as datetime_from_string
+
+
+NON_DIGIT_PATTERN = re.compile(r'\D')
+
+
+def to_snake_case(text):
+    s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', text)
+    return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
+
+
+def dict_keys_to_snake_case(d):
+    data = {to_snake_case(key): value for key, value in d.items()}
+
+    for k, v in data.items():
+        # Skip string values as they are iterable also
+        if isinstance(v, str):
+            continue
+
+        if isinstance(v, dict):
+            data[k] = dict_keys_to_snake_case(v)
+
+        elif isinstance(v, collections.abc.Iterable):
+            new_items = []
+            for item in v:
+                if isinstance(item, (dict, collections.abc.Iterable)):
+                    new_items.append(dict_keys_to_snake_case(item))
+                else:
+                    new_items.append(item)
+
+            data[k] = new_items
+
+    return data
+
+
+def convert_data(data):
+    data = {to_snake_case(key): value for key, value in data.items()}
+
+    data['released'] = datetime_from_string(data['released']).date()
+    data['imdb_votes'] = int(NON_DIGIT_PATTERN.sub('', data['imdb_votes']))
+    data['metascore'] = int(NON_DIGIT_PATTERN.sub('', data['metascore']))
+
+    return data
+
+
+def parse_response(data):
+    data = dict_keys_to_snake_case(data)
+    data.pop('response', None)
+    return convert_data(data)
@@ -0,0 +1,170 @@
+import datetime
+import hashlib
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+
+from moviesproject.metrics import Collector
+
+
+HOUR = datetime.timedelta(hours=1)
+DAY = datetime.timedelta(days=1)
+
+BUCKET_FORMATS = {
+    'hour': '%Y-%m-%dT%H',
+    'day': '%Y-%m-%d',
+    'month': '%Y-%m',
+    'year': '%Y',
+}
+
+
+class TopMoviesCache(object):
+    """
+    Serialized `/top-movies/` rankings keyed by normalized filter parameters.
+
+    Time is split into hour, day, month and year buckets, each with its own
+    generation counter. The key of a ranking includes the generations of the
+    buckets covering its window, so a new comment only invalidates the rankings
+    whose window it falls into by incrementing the counters of its hour, day, month
+    and year. New movies appear in all rankings, creating one moves all entries to
+    a new global generation.
+
+    Windows needing more than `MAX_BUCKETS` buckets are not cached, the window
+    is picked by the client and each bucket is one more key to fetch.
+    """
+
+    PREFIX = 'top-movies'
+    GENERATION_KEY = PREFIX + ':generation'
+    HITS_KEY = PREFIX + ':hits'
+    MISSES_KEY = PREFIX + ':misses'
+
+    MAX_BUCKETS = 150
+
+    @classmethod
+    def _cache(cls):
+        return caches[settings.TOP_MOVIES_CACHE_ALIAS]
+
+    @classmethod
+    def _increment(cls, key):
+        cache = cls._cache()
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+    @classmethod
+    def _bucket_key(cls, size, start):
+        return '{}:{}:{}'.format(cls.PREFIX, size, start.strftime(BUCKET_FORMATS[size]))
+
+    @classmethod
+    def _window_buckets(cls, after, before):
+        """
+        Returns the keys of the fewest buckets covering the whole hours around the window,
+        `None` when more than `MAX_BUCKETS` are needed.
+        """
+        try:
+            start = after.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+            end = before.astimezone(datetime.timezone.utc)
+            if end.replace(minute=0, second=0, microsecond=0) != end:
+                end = end.replace(minute=0, second=0, microsecond=0) + HOUR
+
+            keys = []
+            while start < end:
+                if len(keys) == cls.MAX_BUCKETS:
+                    return None
+
+                midnight = start.hour == 0
+                if midnight and start.day == 1 and start.month == 1 and start.replace(year=start.year + 1) <= end:
+                    keys.append(cls._bucket_key('year', start))
+                    start = start.replace(year=start.year + 1)
+                    continue
+
+                next_month = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+                if midnight and start.day == 1 and next_month <= end:
+                    keys.append(cls._bucket_key('month', start))
+                    start = next_month
+                elif midnight and start + DAY <= end:
+                    keys.append(cls._bucket_key('day', start))
+                    start += DAY
+                else:
+                    keys.append(cls._bucket_key('hour', start))
+                    start += HOUR
+        except (OverflowError, ValueError):
+            # Windows reaching the limits of `datetime`
+            return None
+
+        return keys
+
+    @classmethod
+    def key(cls, after, before, movie_ids):
+        """
+        Returns the cache key of a ranking, to be computed before the ranking itself is.
+
+        Windows needing too many buckets are not cached, `None` is returned for them.
+        """
+        buckets = cls._window_buckets(after, before)
+        if buckets is None:
+            return None
+
+        generations = cls._cache().get_many([cls.GENERATION_KEY] + buckets)
+
+        params = '{}:{}:{}:{}'.format(
+            after.astimezone(datetime.timezone.utc).isoformat(),
+            before.astimezone(datetime.timezone.utc).isoformat(),
+            ','.join(sorted(set(map(str, movie_ids or ())))),
+            ','.join(str(generations.get(key, 0)) for key in buckets)
+        )
+        return '{}:{}:{}'.format(
+            cls.PREFIX, generations.get(cls.GENERATION_KEY, 0), hashlib.sha1(params.encode('utf-8')).hexdigest()
+        )
+
+    @classmethod
+    def get(cls, key):
+        data = cls._cache().get(key)
+
+        cls._increment(cls.MISSES_KEY if data is None else cls.HITS_KEY)
+        return data
+
+    @classmethod
+    def set(cls, key, data):
+        cls._cache().set(key, data)
+
+    @classmethod
+    def invalidate_comment(cls, created_at):
+        hour = created_at.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        for size, start in (('hour', hour), ('day', hour.replace(hour=0)), ('month', hour.replace(day=1, hour=0)),
+                            ('year', hour.replace(month=1, day=1, hour=0))):
+            cls._increment(cls._bucket_key(size, start))
+
+    @classmethod
+    def invalidate_all(cls):
+        cls._increment(cls.GENERATION_KEY)
+
+    @classmethod
+    def stats(cls):
+        counters = cls._cache().get_many([cls.HITS_KEY, cls.MISSES_KEY])
+        return {
+            'hits': counters.get(cls.HITS_KEY, 0),
+            'misses': counters.get(cls.MISSES_KEY, 0),
+        }
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    backend = settings.CACHES[settings.TOP_MOVIES_CACHE_ALIAS]['BACKEND']
+    if backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+
+    return [checks.Warning(
+        'The top movies cache is local to each process, comments and movies created '
+        'through one process do not invalidate the rankings cached by the others.',
+        hint='Set TOP_MOVIES_CACHE_BACKEND and TOP_MOVIES_CACHE_LOCATION to a shared cache.',
+        id='moviesapp.W001',
+    )]
+
+
+def _collect_lookups():
+    stats = TopMoviesCache.stats()
+    return [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])]
+
+
+Collector('top_movies_cache_lookups_total', 'Lookups in the top movies response cache', 'counter', _collect_lookups)
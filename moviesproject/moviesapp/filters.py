@@ -1,14 +1,77 @@
-from django.db.models import Window, Count, Q, F
-from django.db.models.functions import DenseRank
+from django.db.models import Window, Count, Sum, Q, F, OuterRef, Subquery, IntegerField
+from django.db.models.functions import Coalesce, DenseRank
 
 from moviesproject import filters
 
 from . import models
 
 
+class TagFilter(filters.BaseCSVFilter, filters.CharFilter):
+    """
+    Keeps movies tagged with every one of the comma separated names in a role, e.g. `?genre=Drama,Crime`.
+    """
+    def __init__(self, *args, role, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.role = role
+
+    def filter(self, qs, value):
+        kind = models.MovieTag.ROLES[self.role][0]
+
+        # Every name joins the tags once more, a movie has at most one matching tag per join
+        for name in value or ():
+            qs = qs.filter(movie_tags__role=self.role, movie_tags__tag__kind=kind, movie_tags__tag__name=name)
+
+        return qs
+
+
+class MovieFilterSet(filters.FilterSet):
+    search = filters.SearchFilter(
+        field_name='search_vector',
+        fields=('title', 'plot', 'actors', 'director', 'genre')
+    )
+
+    runtime_min = filters.NumberFilter(field_name='runtime_minutes', lookup_expr='gte')
+    runtime_max = filters.NumberFilter(field_name='runtime_minutes', lookup_expr='lte')
+    box_office_min = filters.NumberFilter(field_name='box_office_usd', lookup_expr='gte')
+    box_office_max = filters.NumberFilter(field_name='box_office_usd', lookup_expr='lte')
+    imdb_rating_min = filters.NumberFilter(field_name='imdb_rating', lookup_expr='gte')
+    imdb_rating_max = filters.NumberFilter(field_name='imdb_rating', lookup_expr='lte')
+
+    genre = TagFilter(role=models.MovieTag.GENRE)
+    country = TagFilter(role=models.MovieTag.COUNTRY)
+    language = TagFilter(role=models.MovieTag.LANGUAGE)
+    actor = TagFilter(role=models.MovieTag.ACTOR)
+    director = TagFilter(role=models.MovieTag.DIRECTOR)
+    writer = TagFilter(role=models.MovieTag.WRITER)
+
+    # Declared last, so that it takes precedence over the rank order of search results
+    ordering = filters.OrderingFilter(fields=(
+        ('imdb_rating', 'imdb_rating'),
+        ('runtime_minutes', 'runtime'),
+        ('box_office_usd', 'box_office'),
+        ('comments_count', 'comments_count'),
+        ('last_comment_at', 'last_comment_at'),
+    ))
+
+
 class CommentFilterSet(filters.FilterSet):
     movie = filters.ModelChoiceFilter(queryset=models.Movie.objects.all())
-    search = filters.CharFilter(field_name='content', lookup_expr='icontains')
+    search = filters.SearchFilter(field_name='search_vector', fields=('content',))
+
+
+def _per_movie(queryset, aggregate):
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(movie=OuterRef('pk'))
+            .order_by()
+            .values('movie')
+            .annotate(total=aggregate)
+            .values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
 
 
 class TopMovieFilterSet(filters.FilterSet):
@@ -27,15 +90,30 @@ class TopMovieFilterSet(filters.FilterSet):
         before = self.declared_filters['comments_before'].field.to_python(before_str)
 
         return query.annotate(
-            total_comments=Count(
-                expression='comments',
-                filter=Q(
-                    comments__created_at__gt=value,
-                    comments__created_at__lt=before
-                )
-            ),
+            total_comments=self.count_comments(value, before),
             rank=Window(
                 expression=DenseRank(),
                 order_by=F('total_comments').desc()
             )
         )
+
+    @staticmethod
+    def count_comments(after, before):
+        # Hours lying entirely inside the range are summed from the rollup table,
+        # only comments from the partial hours at its edges are counted one by one
+        first_bucket = models.CommentCount.bucket_start(after) + models.CommentCount.BUCKET_SIZE
+        last_bucket = models.CommentCount.bucket_start(before)
+
+        if first_bucket >= last_bucket:
+            return _per_movie(
+                models.Comment.objects.filter(created_at__gt=after, created_at__lt=before),
+                Count('id')
+            )
+
+        buckets = models.CommentCount.objects.filter(bucket__gte=first_bucket, bucket__lt=last_bucket)
+        edge_comments = models.Comment.objects.filter(
+            Q(created_at__gt=after, created_at__lt=first_bucket) |
+            Q(created_at__gte=last_bucket, created_at__lt=before)
+        )
+
+        return _per_movie(buckets, Sum('count')) + _per_movie(edge_comments, Count('id'))
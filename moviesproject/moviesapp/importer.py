@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from . import serializers
+from .omdb import OMDB, MovieNotFound
+
+
+CREATED = 'created'
+EXISTS = 'exists'
+FAILED = 'failed'
+
+
+def _fetch(title):
+    try:
+        data = OMDB.get_movie_by_title(title)
+    except MovieNotFound:
+        return None, 'movie not found'
+    except Exception as exception:
+        return None, 'OMDB request failed: {}'.format(exception)
+
+    serializer = serializers.MovieListSerializer(data=data)
+    if not serializer.is_valid():
+        return None, serializer.errors
+
+    return serializer.validated_data, None
+
+
+def import_movies(titles, workers=None, batch_size=None):
+    """
+    Fetches movies from OMDB concurrently and saves them in batches.
+
+    Yields a report entry for every title, in the input order.
+    """
+    workers = workers or settings.MOVIES_IMPORT_WORKERS
+    batch_size = batch_size or settings.MOVIES_IMPORT_BATCH_SIZE
+
+    titles = list(titles)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for start in range(0, len(titles), batch_size):
+            batch = titles[start:start + batch_size]
+            fetched = list(executor.map(_fetch, batch))
+
+            movies = iter(serializers.get_or_create_movies([data for data, error in fetched if error is None]))
+
+            for title, (data, error) in zip(batch, fetched):
+                if error is None:
+                    movie, created = next(movies)
+                    yield {'title': title, 'status': CREATED if created else EXISTS, 'id': movie.id}
+                else:
+                    yield {'title': title, 'status': FAILED, 'error': error}
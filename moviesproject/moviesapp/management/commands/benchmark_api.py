@@ -0,0 +1,214 @@
+import datetime
+import json
+import logging
+import platform
+import random
+import statistics
+import subprocess
+import time
+
+import django
+import requests_mock
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+
+from moviesapp import models
+from moviesapp.benchmarks import dataset
+from moviesapp.omdb import OMDB
+
+
+DATASETS = {
+    'small': (1000, 10000),
+    'medium': (10000, 100000),
+    'large': (50000, 1000000),
+}
+
+
+class Command(BaseCommand):
+    """Django command that benchmarks the API endpoints on a synthetic dataset"""
+
+    help = (
+        'Generates a synthetic dataset inside a rolled back transaction, measures latency and throughput '
+        'of the API endpoints on it and prints the results as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', choices=sorted(DATASETS), default='small', help='Size of the dataset')
+        parser.add_argument('--movies', type=int, help='Number of movies, overrides the dataset size')
+        parser.add_argument('--comments', type=int, help='Number of comments, overrides the dataset size')
+        parser.add_argument('--requests', type=int, default=50, help='Number of measured requests per endpoint')
+        parser.add_argument('--warmup', type=int, default=3, help='Number of requests before measuring')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the dataset and request parameters')
+        parser.add_argument('--output', help='File to write the results to, instead of the standard output')
+        parser.add_argument('--baseline', help='Results of a previous run to compare the median latencies with')
+
+    def get_scenarios(self, movie_ids, end, rng):
+        """
+        Returns (name, method, make_request_kwargs, expected_status, setup) tuples.
+        """
+        movies_url = reverse('api:movie-list')
+        comments_url = reverse('api:comment-list')
+        top_movies_url = reverse('api:top-movies-list')
+        movie_facets_url = reverse('api:movie-facets')
+
+        top_movies_params = {
+            'comments_after': (end - datetime.timedelta(days=7)).isoformat(),
+            'comments_before': end.isoformat(),
+        }
+        top_movies_cache = caches[settings.TOP_MOVIES_CACHE_ALIAS]
+        titles = ('Benchmark {}'.format(i) for i in range(10 ** 9))
+        genres = list(models.Tag.objects.filter(kind=models.Tag.GENRE).values_list('name', flat=True)) or ['Drama']
+
+        return (
+            ('movies', 'get', lambda: {'path': movies_url}, 200, None),
+            ('movies_sparse', 'get', lambda: {'path': movies_url, 'data': {'fields': 'id,title,year,imdb_rating'}},
+             200, None),
+            ('movies_by_genre', 'get', lambda: {'path': movies_url, 'data': {'genre': rng.choice(genres)}}, 200, None),
+            ('movies_facets', 'get', lambda: {'path': movie_facets_url}, 200, None),
+            ('comments', 'get', lambda: {'path': comments_url}, 200, None),
+            ('comments_by_movie', 'get', lambda: {'path': comments_url, 'data': {'movie': rng.choice(movie_ids)}},
+             200, None),
+            ('comments_search', 'get', lambda: {'path': comments_url, 'data': {'search': rng.choice(dataset.WORDS)}},
+             200, None),
+            ('top_movies', 'get', lambda: {'path': top_movies_url, 'data': top_movies_params}, 200,
+             top_movies_cache.clear),
+            ('top_movies_cached', 'get', lambda: {'path': top_movies_url, 'data': top_movies_params}, 200, None),
+            ('movies_create', 'post', lambda: {
+                'path': movies_url, 'data': {'title': next(titles)}, 'content_type': 'application/json'
+            }, 201, None),
+        )
+
+    def mock_omdb(self, mock):
+        with open(dataset.PAYLOADS_PATH, encoding='utf-8') as payloads_file:
+            template = json.load(payloads_file)[0]
+        counter = iter(range(10 ** 9))
+
+        def movie(request, context):
+            return dict(template, Title=request.qs['t'][0], imdbID='tt8{:08d}'.format(next(counter)))
+
+        mock.get(OMDB.API_BASE_URL, json=movie)
+
+    def run_scenario(self, client, scenario, requests_count, warmup):
+        name, method, make_request_kwargs, expected_status, setup = scenario
+
+        durations = []
+        for i in range(warmup + requests_count):
+            if setup is not None:
+                setup()
+
+            kwargs = make_request_kwargs()
+            start = time.perf_counter()
+            response = getattr(client, method)(**kwargs)
+            duration = time.perf_counter() - start
+
+            if response.status_code != expected_status:
+                raise CommandError('{} responded with {} instead of {}: {}'.format(
+                    name, response.status_code, expected_status, response.content[:200]))
+
+            if i >= warmup:
+                durations.append(duration)
+
+        return {
+            'requests': requests_count,
+            'throughput_rps': round(requests_count / sum(durations), 2),
+            'min_ms': round(min(durations) * 1e3, 3),
+            'mean_ms': round(statistics.mean(durations) * 1e3, 3),
+            'p50_ms': round(self.percentile(durations, 50) * 1e3, 3),
+            'p95_ms': round(self.percentile(durations, 95) * 1e3, 3),
+            'p99_ms': round(self.percentile(durations, 99) * 1e3, 3),
+            'max_ms': round(max(durations) * 1e3, 3),
+        }
+
+    @staticmethod
+    def percentile(values, percent):
+        values = sorted(values)
+        return values[min(len(values) - 1, int(round(percent / 100 * (len(values) - 1))))]
+
+    def compare(self, results, path):
+        with open(path, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+        self.stderr.write('Median latency compared with {}'.format(baseline.get('commit') or path))
+        for name, result in results['scenarios'].items():
+            previous = baseline['scenarios'].get(name)
+            if previous is None:
+                continue
+
+            change = (result['p50_ms'] - previous['p50_ms']) / previous['p50_ms'] * 100
+            self.stderr.write('{:20} {:10.3f} ms -> {:10.3f} ms ({:+.1f}%)'.format(
+                name, previous['p50_ms'], result['p50_ms'], change))
+
+    @staticmethod
+    def get_commit():
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, stderr=subprocess.DEVNULL
+            ).decode('ascii').strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        movies, comments = DATASETS[options['dataset']]
+        movies = options['movies'] if options['movies'] is not None else movies
+        comments = options['comments'] if options['comments'] is not None else comments
+
+        if movies < 1 or options['requests'] < 1:
+            raise CommandError('At least one movie and one request per endpoint are needed')
+
+        # Fixed, so that repeated runs query the same windows
+        end = datetime.datetime(2019, 7, 1, tzinfo=datetime.timezone.utc)
+
+        results = {
+            'commit': self.get_commit(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+            },
+            'dataset': {'movies': movies, 'comments': comments, 'seed': options['seed']},
+            'scenarios': {},
+        }
+
+        timing_logger = logging.getLogger('moviesproject.timing')
+        timing_level = timing_logger.level
+        timing_logger.setLevel(logging.WARNING)
+
+        try:
+            with transaction.atomic():
+                generation_start = time.perf_counter()
+                movie_ids = dataset.generate(movies, comments, end, seed=options['seed'])
+                results['dataset']['generation_s'] = round(time.perf_counter() - generation_start, 3)
+
+                caches[settings.OMDB_CACHE_ALIAS].clear()
+                caches[settings.TOP_MOVIES_CACHE_ALIAS].clear()
+
+                rng = random.Random(options['seed'])
+                client = Client()
+
+                with requests_mock.Mocker() as mock:
+                    self.mock_omdb(mock)
+
+                    for scenario in self.get_scenarios(movie_ids, end, rng):
+                        self.stderr.write('Benchmarking {}'.format(scenario[0]))
+                        results['scenarios'][scenario[0]] = self.run_scenario(
+                            client, scenario, options['requests'], options['warmup'])
+
+                transaction.set_rollback(True)
+        finally:
+            timing_logger.setLevel(timing_level)
+
+        if options['baseline']:
+            self.compare(results, options['baseline'])
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output_file:
+                output_file.write(output + '\n')
+        else:
+            self.stdout.write(output)
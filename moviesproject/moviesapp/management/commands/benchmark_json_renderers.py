@@ -0,0 +1,61 @@
+import datetime
+import decimal
+import json
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rest_framework.renderers import JSONRenderer
+
+from moviesapp.omdb import OMDB
+from moviesproject.renderers import ORJSONRenderer
+
+from .benchmark_omdb_normalizer import PAYLOADS_PATH
+
+
+class Command(BaseCommand):
+    """Django command that compares JSON renderers"""
+
+    help = 'Compares ORJSONRenderer with the default JSONRenderer on movie and comment lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=10000, help='Number of items in every list')
+        parser.add_argument('--repeat', type=int, default=5, help='Number of runs, the fastest one is reported')
+
+    def get_lists(self, size):
+        with open(PAYLOADS_PATH, encoding='utf-8') as payloads_file:
+            movies = [OMDB._parse_response('', payload) for payload in json.load(payloads_file)]
+
+        # Typed values are left for the encoders, as they are with `COERCE_DECIMAL_TO_STRING` off
+        # or in data which does not come from a serializer
+        created_at = datetime.datetime(2019, 7, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc)
+        return (
+            ('movies', [
+                dict(movies[i % len(movies)], id=i, imdb_rating=decimal.Decimal('7.6'), released=datetime.date(1989, 6, 23))
+                for i in range(size)
+            ]),
+            ('comments', [
+                {'content': 'Comment {}'.format(i), 'movie': i % 100, 'created_at': created_at + datetime.timedelta(seconds=i)}
+                for i in range(size)
+            ]),
+        )
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        default_renderer = JSONRenderer()
+        orjson_renderer = ORJSONRenderer()
+
+        for name, data in self.get_lists(options['size']):
+            if json.loads(default_renderer.render(data)) != json.loads(orjson_renderer.render(data)):
+                raise CommandError('Renderers disagree on the {} list'.format(name))
+
+            def run(renderer):
+                return min(timeit.repeat(lambda: renderer.render(data), number=1, repeat=options['repeat']))
+
+            default = run(default_renderer)
+            fast = run(orjson_renderer)
+
+            self.stdout.write(self.style.MIGRATE_HEADING('{} {}'.format(options['size'], name)))
+            self.stdout.write('JSONRenderer:   {:8.2f} ms'.format(default * 1e3))
+            self.stdout.write('ORJSONRenderer: {:8.2f} ms'.format(fast * 1e3))
+            self.stdout.write(self.style.SUCCESS('speedup:        {:8.2f}x'.format(default / fast)))
@@ -0,0 +1,60 @@
+import random
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rest_framework.renderers import JSONRenderer
+
+from moviesapp import models, serializers
+from moviesapp.benchmarks import dataset
+from moviesapp.views import MovieViewset
+from moviesproject.serializers import ValuesSerializer
+
+
+class Command(BaseCommand):
+    """Django command that compares movie list serialization paths"""
+
+    help = (
+        'Compares serializing movie lists from model instances with serializing them from values() rows, '
+        'on movies created inside a rolled back transaction'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1000, 10000, 100000], help='Numbers of movies to serialize'
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Number of runs, the fastest one is reported')
+
+    def serialize_instances(self, size):
+        movies = MovieViewset.queryset.order_by('id')[:size]
+        return JSONRenderer().render(serializers.MovieListSerializer(movies, many=True).data)
+
+    def serialize_values(self, size):
+        values_serializer = ValuesSerializer(serializers.MovieListSerializer(), models.Movie)
+        rows = models.Movie.objects.order_by('id').values(*values_serializer.columns)[:size]
+        return JSONRenderer().render(values_serializer.to_representation(rows))
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        sizes = sorted(options['sizes'])
+
+        with transaction.atomic():
+            dataset.create_movies(sizes[-1], random.Random(0))
+
+            for size in sizes:
+                if self.serialize_instances(size) != self.serialize_values(size):
+                    raise CommandError('Serialization paths disagree on {} movies'.format(size))
+
+                def run(serialize):
+                    return min(timeit.repeat(lambda: serialize(size), number=1, repeat=options['repeat']))
+
+                instances = run(self.serialize_instances)
+                values = run(self.serialize_values)
+
+                self.stdout.write(self.style.MIGRATE_HEADING('{} movies'.format(size)))
+                self.stdout.write('instances: {:10.1f} ms'.format(instances * 1e3))
+                self.stdout.write('values:    {:10.1f} ms'.format(values * 1e3))
+                self.stdout.write(self.style.SUCCESS('speedup:   {:10.2f}x'.format(instances / values)))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,49 @@
+import json
+import os
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moviesapp.benchmarks import legacy_omdb
+from moviesapp.omdb import OMDB
+
+
+PAYLOADS_PATH = os.path.join(os.path.dirname(legacy_omdb.__file__), 'omdb_payloads.json')
+
+
+def parse_legacy(payload):
+    # Numbers derived from the texts are added by both normalizers in the same way
+    return OMDB._convert_data(legacy_omdb.parse_response(payload))
+
+
+class Command(BaseCommand):
+    """Django command that compares OMDB response normalizers"""
+
+    help = 'Compares the single-pass OMDB response normalizer with the previous implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=10000, help='Number of runs over all payloads')
+        parser.add_argument('--payloads', default=PAYLOADS_PATH, help='JSON file with a list of OMDB responses')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        with open(options['payloads'], encoding='utf-8') as payloads_file:
+            payloads = json.load(payloads_file)
+
+        for payload in payloads:
+            if OMDB._parse_response('', payload) != parse_legacy(payload):
+                raise CommandError('Normalizers disagree on {!r}'.format(payload.get('Title')))
+
+        def run(parse):
+            def benchmark():
+                for payload in payloads:
+                    parse(payload)
+            return min(timeit.repeat(benchmark, number=options['number'], repeat=3))
+
+        legacy = run(parse_legacy)
+        current = run(lambda payload: OMDB._parse_response('', payload))
+
+        calls = options['number'] * len(payloads)
+        self.stdout.write('legacy:      {:8.2f} us per response'.format(legacy / calls * 1e6))
+        self.stdout.write('single-pass: {:8.2f} us per response'.format(current / calls * 1e6))
+        self.stdout.write(self.style.SUCCESS('speedup:     {:8.2f}x'.format(legacy / current)))
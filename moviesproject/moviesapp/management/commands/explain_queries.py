@@ -0,0 +1,86 @@
+import datetime
+
+from django.db import connection, transaction
+from django.db.models import F, Window
+from django.db.models.functions import DenseRank
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from moviesapp import models
+from moviesapp.filters import CommentFilterSet, MovieFilterSet, TopMovieFilterSet
+
+
+class Command(BaseCommand):
+    """Django command that prints query plans of the hot query shapes"""
+
+    help = 'Prints query plans of the hot query shapes, optionally next to the plans without the indexes'
+
+    INDEXES = (
+        'comment_movie_created_at_idx',
+        'comment_search_vector_idx',
+        'movie_title_idx',
+        'movie_search_vector_idx',
+        'movietag_tag_role_movie_idx',
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true', help='Execute the queries and show actual timings')
+        parser.add_argument(
+            '--compare', action='store_true',
+            help='Also explain the queries with the indexes dropped inside a rolled back transaction '
+                 '(PostgreSQL only, locks the tables for the duration of the command)'
+        )
+
+    def get_queries(self):
+        movie = models.Movie.objects.last()
+        if movie is None:
+            raise CommandError('No movies in the database, there is nothing to explain')
+
+        before = timezone.now()
+        after = before - datetime.timedelta(days=7)
+
+        return (
+            ('Comments of a movie (page)', models.Comment.objects.filter(movie=movie).order_by(
+                'movie_id', 'created_at', 'id')[:100]),
+            ('Comments search', CommentFilterSet.base_filters['search'].filter(
+                models.Comment.objects.all(), 'great')[:100]),
+            ('Movies search', MovieFilterSet.base_filters['search'].filter(
+                models.Movie.objects.all(), movie.title)[:100]),
+            ('Movies by genre', MovieFilterSet.base_filters['genre'].filter(
+                models.Movie.objects.all(), movie.genre.split(',')[:1])[:100]),
+            ('Top movies', models.Movie.objects.annotate(
+                total_comments=TopMovieFilterSet.count_comments(after, before),
+                rank=Window(expression=DenseRank(), order_by=F('total_comments').desc())
+            )),
+            ('Movie by title', models.Movie.objects.filter(title=movie.title)),
+            ('Movie by IMDb id', models.Movie.objects.filter(imdb_id=movie.imdb_id)),
+        )
+
+    def explain(self, analyze):
+        options = {'analyze': analyze} if connection.vendor == 'postgresql' else {}
+
+        for name, queryset in self.get_queries():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(queryset.explain(**options))
+            self.stdout.write('')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        self.stdout.write(self.style.SUCCESS('With indexes'))
+        self.explain(options['analyze'])
+
+        if not options['compare']:
+            return
+
+        if connection.vendor != 'postgresql':
+            raise CommandError('--compare requires PostgreSQL, which can drop indexes transactionally')
+
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                for index in self.INDEXES:
+                    cursor.execute('DROP INDEX IF EXISTS {}'.format(connection.ops.quote_name(index)))
+
+            self.stdout.write(self.style.SUCCESS('Without indexes'))
+            self.explain(options['analyze'])
+
+            transaction.set_rollback(True)
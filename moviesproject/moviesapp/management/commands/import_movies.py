@@ -0,0 +1,46 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moviesapp.importer import import_movies, CREATED, EXISTS
+
+
+class Command(BaseCommand):
+    """Django command that imports movies from OMDB by their titles"""
+
+    help = 'Imports movies from OMDB by titles given as arguments or in a file, one title per line'
+
+    def add_arguments(self, parser):
+        parser.add_argument('titles', nargs='*', help='Titles of movies to import')
+        parser.add_argument('--file', help='File with one title per line, "-" reads the standard input')
+        parser.add_argument('--workers', type=int, help='Number of concurrent OMDB requests')
+        parser.add_argument('--batch-size', type=int, help='Number of movies saved in a single transaction')
+
+    def read_titles(self, path):
+        if path == '-':
+            return sys.stdin.read().splitlines()
+
+        with open(path, encoding='utf-8') as titles_file:
+            return titles_file.read().splitlines()
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        titles = list(options['titles'])
+        if options['file']:
+            titles += self.read_titles(options['file'])
+
+        titles = [title.strip() for title in titles if title.strip()]
+        if not titles:
+            raise CommandError('No titles to import were given')
+
+        created = 0
+        for entry in import_movies(titles, workers=options['workers'], batch_size=options['batch_size']):
+            if entry['status'] == CREATED:
+                created += 1
+                self.stdout.write('{title!r}: created (id={id})'.format(**entry))
+            elif entry['status'] == EXISTS:
+                self.stdout.write('{title!r}: already exists (id={id})'.format(**entry))
+            else:
+                self.stdout.write(self.style.ERROR('{title!r}: failed ({error})'.format(**entry)))
+
+        self.stdout.write(self.style.SUCCESS('Imported {} of {} movies'.format(created, len(titles))))
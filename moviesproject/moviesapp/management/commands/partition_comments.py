@@ -0,0 +1,54 @@
+from django.db import connection, transaction
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from moviesapp import partitions
+
+
+class Command(BaseCommand):
+    """Django command that maintains the monthly partitions of the comments table"""
+
+    help = (
+        'Creates the partitions of the coming months of the comments table and detaches the old ones, '
+        'optionally converting the table to a partitioned one first (PostgreSQL 11+ only)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convert', action='store_true',
+            help='Replace the plain comments table with a partitioned one holding the same rows '
+                 '(locks the table for the duration of the copy)'
+        )
+        parser.add_argument('--ahead', type=int, default=3, help='Number of future months to create partitions for')
+        parser.add_argument(
+            '--retention', type=int,
+            help='Number of past months to keep attached besides the current one, older partitions are detached'
+        )
+        parser.add_argument('--archive-schema', help='Schema the detached partitions are moved to')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        if connection.vendor != 'postgresql':
+            raise CommandError('Partitioning requires PostgreSQL')
+
+        current_month = partitions.month_start(timezone.now())
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if options['convert']:
+                if partitions.is_partitioned(cursor):
+                    raise CommandError('The comments table is already partitioned')
+
+                for name in partitions.convert(cursor, options['ahead']):
+                    self.stdout.write('created {}'.format(name))
+
+            elif not partitions.is_partitioned(cursor):
+                raise CommandError('The comments table is not partitioned, run the command with --convert first')
+
+            months = [partitions.add_months(current_month, months) for months in range(options['ahead'] + 1)]
+            for name in partitions.create_partitions(cursor, months):
+                self.stdout.write('created {}'.format(name))
+
+            if options['retention'] is not None:
+                before = partitions.add_months(current_month, -options['retention'])
+                for name in partitions.detach_partitions(cursor, before, options['archive_schema']):
+                    self.stdout.write('detached {}'.format(name))
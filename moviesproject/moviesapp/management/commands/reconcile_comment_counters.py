@@ -0,0 +1,41 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+
+from moviesapp import models
+
+
+class Command(BaseCommand):
+    """Django command that fixes drifted movie comment counters"""
+
+    help = 'Recounts the comments of every movie whose comments_count or last_comment_at drifted, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of movies checked per transaction')
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        batch_size = options['batch_size']
+
+        checked = 0
+        fixed = 0
+        last_id = 0
+
+        while True:
+            movie_ids = list(
+                models.Movie.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not movie_ids:
+                break
+
+            with transaction.atomic():
+                drifted = models.Movie.reconcile_comment_counters(movie_ids)
+
+            if options['verbosity'] > 1:
+                for movie_id in drifted:
+                    self.stdout.write('fixed movie {}'.format(movie_id))
+
+            checked += len(movie_ids)
+            fixed += len(drifted)
+            last_id = movie_ids[-1]
+
+        self.stdout.write('checked: {}, fixed: {}'.format(checked, fixed))
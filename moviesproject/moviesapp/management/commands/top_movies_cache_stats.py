@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from moviesapp.cache import TopMoviesCache
+
+
+class Command(BaseCommand):
+    """Django command that reports the top movies cache hit ratio"""
+
+    help = 'Prints hits and misses of the top movies response cache'
+
+    def handle(self, *args, **options):
+        """Handle the command"""
+        stats = TopMoviesCache.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+
+        self.stdout.write('hits: {hits}, misses: {misses}'.format(**stats))
+        self.stdout.write('hit ratio: {:.1%}'.format(ratio))
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:18
+
+import datetime
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+import django.db.models.deletion
+
+
+def fill_comment_counts(apps, schema_editor):
+    Comment = apps.get_model('moviesapp', 'Comment')
+    CommentCount = apps.get_model('moviesapp', 'CommentCount')
+
+    buckets = (
+        Comment.objects
+        .using(schema_editor.connection.alias)
+        .annotate(bucket=TruncHour('created_at', tzinfo=datetime.timezone.utc))
+        .order_by()
+        .values('movie_id', 'bucket')
+        .annotate(count=Count('id'))
+    )
+
+    CommentCount.objects.using(schema_editor.connection.alias).bulk_create(
+        (CommentCount(**bucket) for bucket in buckets.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentCount',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comment_counts', to='moviesapp.Movie')),
+            ],
+            options={
+                'ordering': ['movie', 'bucket'],
+                'unique_together': {('movie', 'bucket')},
+            },
+        ),
+        migrations.RunPython(fill_comment_counts, migrations.RunPython.noop),
+    ]
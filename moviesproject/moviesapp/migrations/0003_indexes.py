@@ -0,0 +1,35 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:19
+
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from moviesproject.operations import PostgreSQLRunSQL
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0002_commentcount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['movie', 'created_at'], name='comment_movie_created_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['title'], name='movie_title_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['imdb_id'], name='movie_imdb_id_idx'),
+        ),
+        TrigramExtension(),
+        # `icontains` compiles to `UPPER(content::text) LIKE UPPER(...)`, so the index is built on that expression
+        PostgreSQLRunSQL(
+            sql='CREATE INDEX comment_content_trgm_idx ON moviesapp_comment '
+                'USING gin ((UPPER(content::text)) gin_trgm_ops);',
+            reverse_sql='DROP INDEX comment_content_trgm_idx;',
+        ),
+    ]
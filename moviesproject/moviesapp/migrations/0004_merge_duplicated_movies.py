@@ -0,0 +1,60 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:24
+
+import datetime
+
+from django.db import migrations
+from django.db.models import Count, Min
+from django.db.models.functions import TruncHour
+
+
+def merge_duplicated_movies(apps, schema_editor):
+    """
+    Keeps the oldest of the movies sharing an IMDb id and moves comments of the others to it.
+    """
+    Movie = apps.get_model('moviesapp', 'Movie')
+    Comment = apps.get_model('moviesapp', 'Comment')
+    CommentCount = apps.get_model('moviesapp', 'CommentCount')
+
+    db_alias = schema_editor.connection.alias
+
+    duplicates = (
+        Movie.objects
+        .using(db_alias)
+        .order_by()
+        .values('imdb_id')
+        .annotate(movies=Count('id'), kept_id=Min('id'))
+        .filter(movies__gt=1)
+    )
+
+    for duplicate in duplicates:
+        movies = Movie.objects.using(db_alias).filter(imdb_id=duplicate['imdb_id'])
+        kept_id = duplicate['kept_id']
+
+        Comment.objects.using(db_alias).filter(movie__in=movies).update(movie_id=kept_id)
+
+        CommentCount.objects.using(db_alias).filter(movie__in=movies).delete()
+        CommentCount.objects.using(db_alias).bulk_create(
+            CommentCount(**bucket)
+            for bucket in (
+                Comment.objects
+                .using(db_alias)
+                .filter(movie_id=kept_id)
+                .annotate(bucket=TruncHour('created_at', tzinfo=datetime.timezone.utc))
+                .order_by()
+                .values('movie_id', 'bucket')
+                .annotate(count=Count('id'))
+            )
+        )
+
+        movies.exclude(id=kept_id).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0003_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicated_movies, migrations.RunPython.noop),
+    ]
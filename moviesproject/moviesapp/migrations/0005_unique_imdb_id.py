@@ -0,0 +1,22 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0004_merge_duplicated_movies'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='movie',
+            name='movie_imdb_id_idx',
+        ),
+        migrations.AlterField(
+            model_name='movie',
+            name='imdb_id',
+            field=models.CharField(max_length=200, unique=True),
+        ),
+    ]
@@ -0,0 +1,87 @@
+# Generated by Django 2.2.2 on 2026-10-17 18:02
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from moviesproject.operations import PostgreSQLRunSQL
+
+
+# Weights rank matches in the title above the people, genre and finally the plot
+MOVIE_TRIGGER_SQL = '''
+CREATE FUNCTION moviesapp_movie_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.director, '')), 'B') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.actors, '')), 'B') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.genre, '')), 'C') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(NEW.plot, '')), 'D');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER moviesapp_movie_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, director, actors, genre, plot ON moviesapp_movie
+    FOR EACH ROW EXECUTE PROCEDURE moviesapp_movie_search_vector_update();
+
+UPDATE moviesapp_movie SET title = title;
+
+CREATE INDEX movie_search_vector_idx ON moviesapp_movie USING gin (search_vector);
+'''
+
+MOVIE_TRIGGER_REVERSE_SQL = '''
+DROP INDEX movie_search_vector_idx;
+DROP TRIGGER moviesapp_movie_search_vector_trigger ON moviesapp_movie;
+DROP FUNCTION moviesapp_movie_search_vector_update();
+'''
+
+COMMENT_TRIGGER_SQL = '''
+CREATE FUNCTION moviesapp_comment_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector := to_tsvector('pg_catalog.english', coalesce(NEW.content, ''));
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER moviesapp_comment_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF content ON moviesapp_comment
+    FOR EACH ROW EXECUTE PROCEDURE moviesapp_comment_search_vector_update();
+
+UPDATE moviesapp_comment SET content = content;
+
+CREATE INDEX comment_search_vector_idx ON moviesapp_comment USING gin (search_vector);
+'''
+
+COMMENT_TRIGGER_REVERSE_SQL = '''
+DROP INDEX comment_search_vector_idx;
+DROP TRIGGER moviesapp_comment_search_vector_trigger ON moviesapp_comment;
+DROP FUNCTION moviesapp_comment_search_vector_update();
+'''
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0005_unique_imdb_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        PostgreSQLRunSQL(sql=MOVIE_TRIGGER_SQL, reverse_sql=MOVIE_TRIGGER_REVERSE_SQL),
+        PostgreSQLRunSQL(sql=COMMENT_TRIGGER_SQL, reverse_sql=COMMENT_TRIGGER_REVERSE_SQL),
+        # Comment search no longer uses `icontains`, the full-text index replaces the trigram one
+        PostgreSQLRunSQL(
+            sql='DROP INDEX comment_content_trgm_idx;',
+            reverse_sql='CREATE INDEX comment_content_trgm_idx ON moviesapp_comment '
+                        'USING gin ((UPPER(content::text)) gin_trgm_ops);',
+        ),
+    ]
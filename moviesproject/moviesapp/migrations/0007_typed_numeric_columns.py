@@ -0,0 +1,41 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:42
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0006_search_vectors'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='box_office_usd',
+            field=models.BigIntegerField(null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='runtime_minutes',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='rating',
+            name='normalized_score',
+            field=models.DecimalField(decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['imdb_rating', 'id'], name='movie_imdb_rating_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['runtime_minutes', 'id'], name='movie_runtime_minutes_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movie',
+            index=models.Index(fields=['box_office_usd', 'id'], name='movie_box_office_usd_idx'),
+        ),
+    ]
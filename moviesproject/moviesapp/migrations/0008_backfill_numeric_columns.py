@@ -0,0 +1,88 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:45
+
+import decimal
+import re
+
+from django.db import migrations
+
+
+BATCH_SIZE = 1000
+
+# Copies of the parsers in `moviesapp.omdb`, as they were when the columns were added
+NON_DIGIT_PATTERN = re.compile(r'\D')
+RUNTIME_PATTERN = re.compile(r'^(\d+) min$')
+RATING_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)(?:/(\d+(?:\.\d+)?)|%)$')
+
+
+def parse_box_office(value):
+    if not value.startswith('$'):
+        return None
+
+    digits = NON_DIGIT_PATTERN.sub('', value)
+    return int(digits) if digits else None
+
+
+def parse_runtime(value):
+    match = RUNTIME_PATTERN.match(value)
+    return int(match.group(1)) if match else None
+
+
+def parse_rating_score(value):
+    match = RATING_PATTERN.match(value)
+    if match is None:
+        return None
+
+    score, scale = decimal.Decimal(match.group(1)), decimal.Decimal(match.group(2) or 100)
+    if not 0 < scale or score > scale:
+        return None
+
+    return (score * 100 / scale).quantize(decimal.Decimal('0.01'))
+
+
+def backfill(queryset, fields, convert):
+    batch = []
+    for obj in queryset.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        convert(obj)
+        batch.append(obj)
+
+        if len(batch) == BATCH_SIZE:
+            queryset.bulk_update(batch, fields)
+            batch = []
+
+    if batch:
+        queryset.bulk_update(batch, fields)
+
+
+def fill_numeric_columns(apps, schema_editor):
+    """
+    Parses the box office, runtime and rating texts of the already saved movies.
+    """
+    Movie = apps.get_model('moviesapp', 'Movie')
+    Rating = apps.get_model('moviesapp', 'Rating')
+
+    db_alias = schema_editor.connection.alias
+
+    def convert_movie(movie):
+        movie.box_office_usd = parse_box_office(movie.box_office)
+        movie.runtime_minutes = parse_runtime(movie.runtime)
+
+    def convert_rating(rating):
+        rating.normalized_score = parse_rating_score(rating.value)
+
+    backfill(
+        Movie.objects.using(db_alias).only('box_office', 'runtime'),
+        ['box_office_usd', 'runtime_minutes'],
+        convert_movie
+    )
+    backfill(Rating.objects.using(db_alias).only('value'), ['normalized_score'], convert_rating)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0007_typed_numeric_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_numeric_columns, migrations.RunPython.noop),
+    ]
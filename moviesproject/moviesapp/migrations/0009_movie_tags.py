@@ -0,0 +1,40 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0008_backfill_numeric_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('genre', 'Genre'), ('country', 'Country'), ('language', 'Language'), ('person', 'Person')], max_length=20)),
+                ('name', models.CharField(max_length=200)),
+            ],
+            options={
+                'ordering': ['kind', 'name'],
+                'unique_together': {('kind', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='MovieTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('genre', 'Genre'), ('country', 'Country'), ('language', 'Language'), ('actor', 'Actor'), ('director', 'Director'), ('writer', 'Writer')], max_length=20)),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movie_tags', to='moviesapp.Movie')),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movie_tags', to='moviesapp.Tag')),
+            ],
+            options={
+                'ordering': ['movie', 'role', 'tag'],
+                'indexes': [models.Index(fields=['tag', 'role', 'movie'], name='movietag_tag_role_movie_idx')],
+                'unique_together': {('movie', 'role', 'tag')},
+            },
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 2.2.2 on 2026-10-17 14:50
+
+import re
+
+from django.db import migrations
+from django.db.models import Q
+
+
+BATCH_SIZE = 1000
+
+# Copies of `moviesapp.models.split_names` and `MovieTag.ROLES`, as they were when the tags were added
+NAME_NOTE_PATTERN = re.compile(r'\s*\([^)]*\)')
+
+ROLES = {
+    'genre': ('genre', 'genre'),
+    'country': ('country', 'country'),
+    'language': ('language', 'language'),
+    'actor': ('person', 'actors'),
+    'director': ('person', 'director'),
+    'writer': ('person', 'writer'),
+}
+
+
+def split_names(value):
+    names = []
+    for name in value.split(','):
+        name = NAME_NOTE_PATTERN.sub('', name).strip()
+        if name and name != 'N/A' and name not in names:
+            names.append(name)
+
+    return names
+
+
+def tag_movies(Tag, MovieTag, movies, db_alias):
+    links = [
+        (movie.id, role, kind, name)
+        for movie in movies
+        for role, (kind, field_name) in ROLES.items()
+        for name in split_names(getattr(movie, field_name))
+    ]
+    if not links:
+        return
+
+    names = {}
+    for movie_id, role, kind, name in links:
+        names.setdefault(kind, set()).add(name)
+
+    Tag.objects.using(db_alias).bulk_create(
+        [Tag(kind=kind, name=name) for kind, kind_names in names.items() for name in kind_names],
+        ignore_conflicts=True
+    )
+
+    condition = Q()
+    for kind, kind_names in names.items():
+        condition |= Q(kind=kind, name__in=kind_names)
+
+    tag_ids = {
+        (kind, name): tag_id
+        for tag_id, kind, name in Tag.objects.using(db_alias).filter(condition).order_by().values_list('id', 'kind', 'name')
+    }
+
+    MovieTag.objects.using(db_alias).bulk_create(
+        [MovieTag(movie_id=movie_id, role=role, tag_id=tag_ids[kind, name]) for movie_id, role, kind, name in links]
+    )
+
+
+def fill_movie_tags(apps, schema_editor):
+    """
+    Tags the already saved movies with the names listed in their comma joined fields.
+    """
+    Movie = apps.get_model('moviesapp', 'Movie')
+    Tag = apps.get_model('moviesapp', 'Tag')
+    MovieTag = apps.get_model('moviesapp', 'MovieTag')
+
+    db_alias = schema_editor.connection.alias
+
+    movies = Movie.objects.using(db_alias).only(*{field_name for kind, field_name in ROLES.values()})
+
+    batch = []
+    for movie in movies.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+        batch.append(movie)
+
+        if len(batch) == BATCH_SIZE:
+            tag_movies(Tag, MovieTag, batch, db_alias)
+            batch = []
+
+    tag_movies(Tag, MovieTag, batch, db_alias)
+
+
+def remove_movie_tags(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+
+    apps.get_model('moviesapp', 'MovieTag').objects.using(db_alias).all().delete()
+    apps.get_model('moviesapp', 'Tag').objects.using(db_alias).all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0009_movie_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_movie_tags, remove_movie_tags),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.2 on 2026-10-17 15:12
+
+from django.db import migrations
+from django.db.models import Count, IntegerField, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+BATCH_SIZE = 1000
+
+
+def fill_comment_counters(apps, schema_editor):
+    """
+    Counts the comments of the already saved movies, a batch of movies per update.
+    """
+    Movie = apps.get_model('moviesapp', 'Movie')
+    Comment = apps.get_model('moviesapp', 'Comment')
+
+    db_alias = schema_editor.connection.alias
+
+    movie_comments = Comment.objects.using(db_alias).filter(movie=OuterRef('pk')).order_by().values('movie')
+    movie_ids = list(Movie.objects.using(db_alias).order_by('pk').values_list('pk', flat=True))
+
+    for start in range(0, len(movie_ids), BATCH_SIZE):
+        Movie.objects.using(db_alias).filter(pk__in=movie_ids[start:start + BATCH_SIZE]).update(
+            comments_count=Coalesce(
+                Subquery(movie_comments.annotate(count=Count('id')).values('count'), output_field=IntegerField()),
+                0
+            ),
+            last_comment_at=Subquery(movie_comments.annotate(last=Max('created_at')).values('last'))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0011_comment_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_comment_counters, migrations.RunPython.noop),
+    ]
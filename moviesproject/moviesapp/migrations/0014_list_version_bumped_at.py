@@ -0,0 +1,18 @@
+# Generated by Django 2.2.2 on 2026-10-17 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('moviesapp', '0013_list_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='listversion',
+            name='bumped_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
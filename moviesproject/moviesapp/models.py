@@ -1,5 +1,13 @@
-from django.db import models
+import datetime
+import re
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import connections, models, transaction
+from django.db.models.functions import Coalesce, Greatest
 from django.core import validators
+from django.utils import timezone
+
+from .cache import TopMoviesCache
 
 
 class Movie(models.Model):
@@ -26,18 +34,91 @@ class Movie(models.Model):
     website = models.CharField(max_length=200)
     writer = models.CharField(max_length=200)
     year = models.IntegerField()
-    imdb_id = models.CharField(max_length=200)
+    imdb_id = models.CharField(max_length=200, unique=True)
     imdb_rating = models.DecimalField(decimal_places=1, max_digits=3)
     imdb_votes = models.IntegerField(validators=[
         validators.MinValueValidator(0),
     ])
 
+    # Parsed from `box_office` and `runtime` for sorting and range filters, null when not reported
+    box_office_usd = models.BigIntegerField(null=True, validators=[
+        validators.MinValueValidator(0),
+    ])
+    runtime_minutes = models.PositiveIntegerField(null=True)
+
+    # Maintained on comment creation, so that they are read without counting the comments,
+    # the `reconcile_comment_counters` command fixes any drift
+    comments_count = models.PositiveIntegerField(default=0)
+    last_comment_at = models.DateTimeField(null=True)
+
+    # Filled in by a PostgreSQL trigger from title, director, actors, genre and plot,
+    # see migration 0006 for the trigger and its GIN index
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['id']
+        indexes = [
+            models.Index(fields=['title'], name='movie_title_idx'),
+            # `id` breaks ties in ordered lists, see `KeysetPagination`
+            models.Index(fields=['imdb_rating', 'id'], name='movie_imdb_rating_idx'),
+            models.Index(fields=['runtime_minutes', 'id'], name='movie_runtime_minutes_idx'),
+            models.Index(fields=['box_office_usd', 'id'], name='movie_box_office_usd_idx'),
+            models.Index(fields=['comments_count', 'id'], name='movie_comments_count_idx'),
+            models.Index(fields=['last_comment_at', 'id'], name='movie_last_comment_at_idx'),
+        ]
 
     def __str__(self):
         return '{self.title} (id={self.id})'.format(self=self)
 
+    @classmethod
+    def add_comment(cls, movie_id, created_at, using='default'):
+        """
+        Counts a new comment in a single atomic update, without reading the movie first.
+        """
+        cls.objects.using(using).filter(pk=movie_id).update(
+            comments_count=models.F('comments_count') + 1,
+            last_comment_at=Greatest(
+                Coalesce('last_comment_at', models.Value(created_at, output_field=models.DateTimeField())),
+                models.Value(created_at, output_field=models.DateTimeField())
+            )
+        )
+
+    @classmethod
+    def reconcile_comment_counters(cls, movie_ids, using='default'):
+        """
+        Recounts the comments of the given movies whose counters drifted, returns the ids of those movies.
+        """
+        comments = Comment.objects.using(using).filter(movie_id__in=movie_ids).order_by().values('movie_id')
+        actual = {
+            row['movie_id']: (row['count'], row['last'])
+            for row in comments.annotate(count=models.Count('id'), last=models.Max('created_at'))
+        }
+
+        drifted = [
+            movie_id
+            for movie_id, count, last in cls.objects.using(using).filter(pk__in=movie_ids).values_list(
+                'id', 'comments_count', 'last_comment_at')
+            if (count, last) != actual.get(movie_id, (0, None))
+        ]
+        if not drifted:
+            return drifted
+
+        # Counted again by the update itself, comments added in the meantime are not lost
+        movie_comments = Comment.objects.filter(movie=models.OuterRef('pk')).order_by().values('movie')
+        cls.objects.using(using).filter(pk__in=drifted).update(
+            comments_count=Coalesce(
+                models.Subquery(
+                    movie_comments.annotate(count=models.Count('id')).values('count'),
+                    output_field=models.IntegerField()
+                ),
+                0
+            ),
+            last_comment_at=models.Subquery(movie_comments.annotate(last=models.Max('created_at')).values('last'))
+        )
+        ListVersion.bump(ListVersion.MOVIES, using=using)
+
+        return drifted
+
 
 class Rating(models.Model):
     movie = models.ForeignKey(Movie, related_name='ratings', on_delete=models.CASCADE)
@@ -45,15 +126,245 @@ class Rating(models.Model):
     source = models.CharField(max_length=200)
     value = models.CharField(max_length=200)
 
+    # `value` as a score out of 100, null when it could not be parsed
+    normalized_score = models.DecimalField(decimal_places=2, max_digits=5, null=True)
+
     class Meta:
         ordering = ['source']
 
 
+# Notes such as the `(screenplay)` following writers
+NAME_NOTE_PATTERN = re.compile(r'\s*\([^)]*\)')
+
+
+def split_names(value):
+    """
+    Returns the distinct names listed in a comma joined OMDB field, in their original order.
+    """
+    names = []
+    for name in value.split(','):
+        name = NAME_NOTE_PATTERN.sub('', name).strip()
+        if name and name != 'N/A' and name not in names:
+            names.append(name)
+
+    return names
+
+
+class Tag(models.Model):
+    """
+    A genre, country, language or person, linked to movies through `MovieTag`.
+    """
+    GENRE = 'genre'
+    COUNTRY = 'country'
+    LANGUAGE = 'language'
+    PERSON = 'person'
+
+    KIND_CHOICES = (
+        (GENRE, 'Genre'),
+        (COUNTRY, 'Country'),
+        (LANGUAGE, 'Language'),
+        (PERSON, 'Person'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    name = models.CharField(max_length=200)
+
+    class Meta:
+        ordering = ['kind', 'name']
+        unique_together = ('kind', 'name')
+
+    def __str__(self):
+        return '{self.name} ({self.kind})'.format(self=self)
+
+
+class MovieTag(models.Model):
+    """
+    Normalized form of the comma joined `Movie` fields, maintained on movie creation.
+    """
+    GENRE = 'genre'
+    COUNTRY = 'country'
+    LANGUAGE = 'language'
+    ACTOR = 'actor'
+    DIRECTOR = 'director'
+    WRITER = 'writer'
+
+    ROLE_CHOICES = (
+        (GENRE, 'Genre'),
+        (COUNTRY, 'Country'),
+        (LANGUAGE, 'Language'),
+        (ACTOR, 'Actor'),
+        (DIRECTOR, 'Director'),
+        (WRITER, 'Writer'),
+    )
+
+    # Kind of the tags of every role and the `Movie` field they are parsed from
+    ROLES = {
+        GENRE: (Tag.GENRE, 'genre'),
+        COUNTRY: (Tag.COUNTRY, 'country'),
+        LANGUAGE: (Tag.LANGUAGE, 'language'),
+        ACTOR: (Tag.PERSON, 'actors'),
+        DIRECTOR: (Tag.PERSON, 'director'),
+        WRITER: (Tag.PERSON, 'writer'),
+    }
+
+    movie = models.ForeignKey(Movie, related_name='movie_tags', on_delete=models.CASCADE)
+    tag = models.ForeignKey(Tag, related_name='movie_tags', on_delete=models.CASCADE)
+
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+
+    class Meta:
+        ordering = ['movie', 'role', 'tag']
+        unique_together = ('movie', 'role', 'tag')
+        indexes = [
+            # Movies with a tag, for filters and facet counts
+            models.Index(fields=['tag', 'role', 'movie'], name='movietag_tag_role_movie_idx'),
+        ]
+
+    @classmethod
+    def tag_movies(cls, movies, using='default'):
+        """
+        Links saved movies to the tags parsed from their fields, in a constant number of queries.
+        """
+        links = [
+            (movie, role, kind, name)
+            for movie in movies
+            for role, (kind, field_name) in cls.ROLES.items()
+            for name in split_names(getattr(movie, field_name))
+        ]
+        if not links:
+            return
+
+        names = {}
+        for movie, role, kind, name in links:
+            names.setdefault(kind, set()).add(name)
+
+        Tag.objects.using(using).bulk_create(
+            [Tag(kind=kind, name=name) for kind, kind_names in names.items() for name in kind_names],
+            ignore_conflicts=True
+        )
+
+        condition = models.Q()
+        for kind, kind_names in names.items():
+            condition |= models.Q(kind=kind, name__in=kind_names)
+
+        tag_ids = {
+            (kind, name): tag_id
+            for tag_id, kind, name in Tag.objects.using(using).filter(condition).order_by().values_list('id', 'kind', 'name')
+        }
+
+        cls.objects.using(using).bulk_create(
+            [cls(movie=movie, role=role, tag_id=tag_ids[kind, name]) for movie, role, kind, name in links]
+        )
+
+
+# The table may be partitioned by month on PostgreSQL, see `moviesapp.partitions`
 class Comment(models.Model):
     movie = models.ForeignKey(Movie, related_name='comments', on_delete=models.CASCADE)
 
     content = models.CharField(max_length=200)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled in by a PostgreSQL trigger from the content, see migration 0006
+    search_vector = SearchVectorField(null=True, editable=False)
+
     class Meta:
         ordering = ['movie', 'created_at']
+        indexes = [
+            models.Index(fields=['movie', 'created_at'], name='comment_movie_created_at_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+            if adding:
+                Movie.add_comment(self.movie_id, self.created_at, using=self._state.db)
+                CommentCount.increment(self.movie_id, self.created_at, using=self._state.db)
+
+                created_at = self.created_at
+                transaction.on_commit(lambda: TopMoviesCache.invalidate_comment(created_at), using=self._state.db)
+
+
+class CommentCount(models.Model):
+    """
+    Number of comments added to a movie within an hour, maintained on comment creation.
+    """
+    BUCKET_SIZE = datetime.timedelta(hours=1)
+
+    movie = models.ForeignKey(Movie, related_name='comment_counts', on_delete=models.CASCADE)
+
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['movie', 'bucket']
+        unique_together = ('movie', 'bucket')
+
+    @classmethod
+    def bucket_start(cls, dt):
+        return dt.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+    @classmethod
+    def increment(cls, movie_id, created_at, using='default'):
+        connection = connections[using]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        count = connection.ops.quote_name('count')
+        bucket = connection.ops.adapt_datetimefield_value(cls.bucket_start(created_at))
+
+        # Single round trip upsert, supported by both PostgreSQL (9.5+) and SQLite (3.24+)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (movie_id, bucket, {count}) VALUES (%s, %s, 1) '
+                'ON CONFLICT (movie_id, bucket) DO UPDATE SET {count} = {table}.{count} + 1'.format(
+                    table=table,
+                    count=count
+                ),
+                [movie_id, bucket]
+            )
+
+
+class ListVersion(models.Model):
+    """
+    Version of an API list, bumped by changes that do not insert rows.
+
+    Lists are versioned by the id of their newest row, see `moviesapp.views`,
+    maintenance such as counter reconciliation or detaching comment partitions
+    changes them without a new one.
+    """
+    MOVIES = 'movies'
+    COMMENTS = 'comments'
+
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    bumped_at = models.DateTimeField(null=True)
+
+    @classmethod
+    def bump(cls, name, using='default'):
+        connection = connections[using]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        version = connection.ops.quote_name('version')
+        bumped_at = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        # Single round trip upsert, like `CommentCount.increment`
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO {table} (name, {version}, bumped_at) VALUES (%s, 1, %s) '
+                'ON CONFLICT (name) DO UPDATE SET {version} = {table}.{version} + 1, bumped_at = %s'.format(
+                    table=table,
+                    version=version
+                ),
+                [name, bumped_at, bumped_at]
+            )
+
+    @classmethod
+    def current(cls, name):
+        """
+        Subquery of the version of `name`, to be annotated on the query checking the newest rows.
+        """
+        return Coalesce(models.Subquery(cls.objects.filter(name=name).values('version')[:1]), 0)
+
+    @classmethod
+    def last_bumped(cls, name):
+        return models.Subquery(cls.objects.filter(name=name).values('bumped_at')[:1])
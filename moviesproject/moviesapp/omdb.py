@@ -1,70 +1,300 @@
 import re
 import os
-import collections
+import hashlib
+import datetime
+import decimal
+import functools
+import threading
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dateutil.parser import parse as datetime_from_string
 
+from django.conf import settings
+from django.core.cache import caches
+
+from moviesproject.timing import measure
+
+
+NON_DIGIT_PATTERN = re.compile(r'\D')
+RUNTIME_PATTERN = re.compile(r'^(\d+) min$')
+RATING_PATTERN = re.compile(r'^(\d+(?:\.\d+)?)(?:/(\d+(?:\.\d+)?)|%)$')
+
+
+def _parse_int(value):
+    digits = value.replace(',', '')
+    if not digits.isdigit():
+        digits = NON_DIGIT_PATTERN.sub('', value)
+
+    return int(digits)
+
+
+def _parse_date(value):
+    try:
+        return datetime.datetime.strptime(value, '%d %b %Y').date()
+    except ValueError:
+        return datetime_from_string(value).date()
+
+
+def _parse_box_office(value):
+    # '$123,456', other currencies are not reported by OMDB
+    if not value.startswith('$') or not NON_DIGIT_PATTERN.sub('', value):
+        return None
+
+    return _parse_int(value)
+
+
+def _parse_runtime(value):
+    # '126 min'
+    match = RUNTIME_PATTERN.match(value)
+    return int(match.group(1)) if match else None
+
+
+def _parse_rating_score(value):
+    # '7.6/10', '69/100' or '71%', as a score out of 100
+    match = RATING_PATTERN.match(value)
+    if match is None:
+        return None
+
+    score, scale = decimal.Decimal(match.group(1)), decimal.Decimal(match.group(2) or 100)
+    if not 0 < scale or score > scale:
+        return None
+
+    return (score * 100 / scale).quantize(decimal.Decimal('0.01'))
+
+
+class MovieNotFound(requests.HTTPError):
+    pass
+
 
 class OMDB(object):
     API_BASE_URL = 'http://www.omdbapi.com/'
     API_KEY = os.environ['OMDB_API_KEY']
 
-    NON_DIGIT_PATTERN = re.compile(r'\D')
+    NOT_FOUND = 'not-found'
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    _session = None
+    _session_lock = threading.Lock()
+
+    NON_DIGIT_PATTERN = NON_DIGIT_PATTERN
+
+    # Names of the known OMDB response keys, other keys are converted by `_to_snake_case`
+    KEYS = {
+        'Title': 'title',
+        'Year': 'year',
+        'Rated': 'rated',
+        'Released': 'released',
+        'Runtime': 'runtime',
+        'Genre': 'genre',
+        'Director': 'director',
+        'Writer': 'writer',
+        'Actors': 'actors',
+        'Plot': 'plot',
+        'Language': 'language',
+        'Country': 'country',
+        'Awards': 'awards',
+        'Poster': 'poster',
+        'Ratings': 'ratings',
+        'Source': 'source',
+        'Value': 'value',
+        'Metascore': 'metascore',
+        'imdbRating': 'imdb_rating',
+        'imdbVotes': 'imdb_votes',
+        'imdbID': 'imdb_id',
+        'Type': 'type',
+        'DVD': 'dvd',
+        'BoxOffice': 'box_office',
+        'Production': 'production',
+        'Website': 'website',
+        'Response': 'response',
+        'Error': 'error',
+        'totalSeasons': 'total_seasons',
+    }
+
+    CONVERTERS = {
+        'released': _parse_date,
+        'imdb_votes': _parse_int,
+        'metascore': _parse_int,
+    }
+
+    # Typed columns derived from free text values, keyed by their names
+    NUMERIC_CONVERTERS = {
+        'box_office_usd': ('box_office', _parse_box_office),
+        'runtime_minutes': ('runtime', _parse_runtime),
+    }
 
     @classmethod
+    @functools.lru_cache(maxsize=1024)
     def _to_snake_case(cls, text):
         s1 = re.sub(r'(.)([A-Z][a-z]+)', r'\1_\2', text)
         return re.sub(r'([a-z0-9])([A-Z])', r'\1_\2', s1).lower()
 
+    @classmethod
+    def _key(cls, key):
+        return cls.KEYS.get(key) or cls._to_snake_case(key)
+
     @classmethod
     def _dict_keys_to_snake_case(cls, d):
-        data = {cls._to_snake_case(key): value for key, value in d.items()}
+        result = {}
 
-        for k, v in data.items():
-            # Skip string values as they are iterable also
-            if isinstance(v, str):
-                continue
+        # Walks nested dicts and lists of dicts with an explicit stack instead of recursion
+        stack = [(d, result)]
+        while stack:
+            source, target = stack.pop()
 
-            if isinstance(v, dict):
-                data[k] = cls._dict_keys_to_snake_case(v)
+            for key, value in source.items():
+                if isinstance(value, dict):
+                    converted = {}
+                    stack.append((value, converted))
+                    value = converted
 
-            elif isinstance(v, collections.Iterable):
-                new_items = []
-                for item in v:
-                    if isinstance(item, (dict, collections.Iterable)):
-                        new_items.append(cls._dict_keys_to_snake_case(item))
-                    else:
-                        new_items.append(item)
+                elif isinstance(value, (list, tuple)):
+                    items = []
+                    for item in value:
+                        if isinstance(item, dict):
+                            converted = {}
+                            stack.append((item, converted))
+                            item = converted
+                        items.append(item)
+                    value = items
 
-                data[k] = new_items
+                target[cls._key(key)] = value
 
-        return data
+        return result
+
+    @classmethod
+    def _normalize(cls, data):
+        """
+        Converts keys of an OMDB response and parses its numbers and dates in a single pass.
+        """
+        normalized = {}
+
+        for key, value in data.items():
+            key = cls._key(key)
+
+            converter = cls.CONVERTERS.get(key)
+            if converter is not None:
+                value = converter(value)
+
+            elif isinstance(value, (dict, list, tuple)):
+                value = cls._dict_keys_to_snake_case({key: value})[key]
+
+            normalized[key] = value
+
+        return normalized
 
     @classmethod
     def _convert_data(cls, data):
-        data = {cls._to_snake_case(key): value for key, value in data.items()}
+        """
+        Adds numbers parsed from the box office, runtime and rating texts of normalized data.
+        """
+        for key, (source, converter) in cls.NUMERIC_CONVERTERS.items():
+            value = data.get(source)
+            data[key] = converter(value) if isinstance(value, str) else None
 
-        data['released'] = datetime_from_string(data['released']).date()
-        data['imdb_votes'] = int(cls.NON_DIGIT_PATTERN.sub('', data['imdb_votes']))
-        data['metascore'] = int(cls.NON_DIGIT_PATTERN.sub('', data['metascore']))
+        for rating in data.get('ratings') or ():
+            value = rating.get('value')
+            rating['normalized_score'] = _parse_rating_score(value) if isinstance(value, str) else None
 
         return data
 
     @classmethod
-    def get_movie_by_title(cls, title):
-        params = {
+    def _create_session(cls):
+        retry = Retry(
+            total=settings.OMDB_RETRIES,
+            backoff_factor=settings.OMDB_RETRY_BACKOFF,
+            status_forcelist=cls.RETRY_STATUSES,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=settings.OMDB_POOL_SIZE, max_retries=retry)
+
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @classmethod
+    def get_session(cls):
+        if cls._session is None:
+            with cls._session_lock:
+                if cls._session is None:
+                    cls._session = cls._create_session()
+
+        return cls._session
+
+    @classmethod
+    def _normalize_title(cls, title):
+        return ' '.join(title.lower().split())
+
+    @classmethod
+    def _cache_key(cls, title):
+        digest = hashlib.sha1(cls._normalize_title(title).encode('utf-8')).hexdigest()
+        return 'omdb:title:{}'.format(digest)
+
+    @classmethod
+    def _get_cached(cls, title):
+        data = caches[settings.OMDB_CACHE_ALIAS].get(cls._cache_key(title))
+        if data == cls.NOT_FOUND:
+            raise MovieNotFound('movie with title %r not found' % title)
+
+        return data
+
+    @classmethod
+    def _set_cached(cls, title, data):
+        caches[settings.OMDB_CACHE_ALIAS].set(cls._cache_key(title), data)
+
+    @classmethod
+    def _set_cached_not_found(cls, title):
+        caches[settings.OMDB_CACHE_ALIAS].set(
+            cls._cache_key(title),
+            cls.NOT_FOUND,
+            settings.OMDB_NOT_FOUND_CACHE_TIMEOUT
+        )
+
+    @classmethod
+    def _request_params(cls, title):
+        return {
             'apikey': cls.API_KEY,
             't': title,
             'plot': 'full'
         }
-        response = requests.get(cls.API_BASE_URL, params=params)
-        response.raise_for_status()
-        data = response.json()
-        data = cls._dict_keys_to_snake_case(data)
 
-        response_status = data.pop('response', None)
-        if response_status != 'True':
-            raise requests.HTTPError('movie with title %r not found' % title)
+    @classmethod
+    def _parse_response(cls, title, data):
+        if data.get('Response') != 'True':
+            raise MovieNotFound('movie with title %r not found' % title)
+
+        data = cls._normalize(data)
+        del data['response']
 
         return cls._convert_data(data)
+
+    @classmethod
+    def get_movie_by_title(cls, title):
+        data = cls._get_cached(title)
+
+        if data is None:
+            try:
+                data = cls._fetch_movie_by_title(title)
+            except MovieNotFound:
+                cls._set_cached_not_found(title)
+                raise
+
+            cls._set_cached(title, data)
+
+        return data
+
+    @classmethod
+    def _fetch_movie_by_title(cls, title):
+        with measure('omdb'):
+            response = cls.get_session().get(
+                cls.API_BASE_URL,
+                params=cls._request_params(title),
+                timeout=(settings.OMDB_CONNECT_TIMEOUT, settings.OMDB_READ_TIMEOUT)
+            )
+        response.raise_for_status()
+
+        return cls._parse_response(title, response.json())
@@ -0,0 +1,75 @@
+import asyncio
+import weakref
+
+import httpx
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+
+from moviesproject.timing import measure
+
+from .omdb import OMDB, MovieNotFound
+
+
+class AsyncOMDB(OMDB):
+    """
+    OMDB client for the asyncio event loop, sharing request building,
+    response parsing and the cache with the blocking `OMDB` client.
+    """
+
+    # httpx clients are bound to the event loop they were first used in
+    _clients = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def _create_client(cls):
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.OMDB_READ_TIMEOUT, connect=settings.OMDB_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=settings.OMDB_POOL_SIZE,
+                max_keepalive_connections=settings.OMDB_POOL_SIZE
+            ),
+            # Retries connection failures, responses with retry statuses are retried below
+            transport=httpx.AsyncHTTPTransport(retries=settings.OMDB_RETRIES),
+        )
+
+    @classmethod
+    def get_client(cls):
+        loop = asyncio.get_event_loop()
+
+        client = cls._clients.get(loop)
+        if client is None:
+            client = cls._clients[loop] = cls._create_client()
+
+        return client
+
+    @classmethod
+    async def get_movie_by_title(cls, title):
+        data = await sync_to_async(cls._get_cached, thread_sensitive=False)(title)
+
+        if data is None:
+            try:
+                data = await cls._fetch_movie_by_title(title)
+            except MovieNotFound:
+                await sync_to_async(cls._set_cached_not_found, thread_sensitive=False)(title)
+                raise
+
+            await sync_to_async(cls._set_cached, thread_sensitive=False)(title, data)
+
+        return data
+
+    @classmethod
+    async def _fetch_movie_by_title(cls, title):
+        client = cls.get_client()
+
+        for attempt in range(settings.OMDB_RETRIES + 1):
+            with measure('omdb'):
+                response = await client.get(cls.API_BASE_URL, params=cls._request_params(title))
+
+            if response.status_code not in cls.RETRY_STATUSES or attempt == settings.OMDB_RETRIES:
+                break
+
+            await asyncio.sleep(settings.OMDB_RETRY_BACKOFF * 2 ** attempt)
+
+        response.raise_for_status()
+
+        return cls._parse_response(title, response.json())
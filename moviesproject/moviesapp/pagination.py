@@ -0,0 +1,16 @@
+from moviesproject.pagination import KeysetPagination
+
+
+class MoviePagination(KeysetPagination):
+    ordering = ('id',)
+
+    # Lists ordered by the ordering or search filters keep their order
+    follow_queryset_ordering = True
+
+
+class CommentPagination(KeysetPagination):
+    # Follows `Comment.Meta.ordering`, `id` breaks ties between comments created at the same time
+    ordering = ('movie_id', 'created_at', 'id')
+
+    # Search results stay ordered by their rank
+    follow_queryset_ordering = True
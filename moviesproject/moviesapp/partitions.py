@@ -0,0 +1,215 @@
+"""
+Monthly range partitioning of the comments table by `created_at`, PostgreSQL 11+ only.
+
+Every month gets its own partition named `moviesapp_comment_yYYYYmMM`, a
+default partition catches comments outside of the created months. Queries
+filtering on `created_at`, such as the top movies counts, only scan the
+partitions of the requested range, and old months can be detached as a
+whole instead of being deleted row by row.
+"""
+import datetime
+import re
+
+from django.db import connection
+
+from .models import Comment, ListVersion, Movie
+
+
+TABLE = Comment._meta.db_table
+DEFAULT_PARTITION = TABLE + '_default'
+
+PARTITION_NAME_PATTERN = re.compile(r'^{}_y(\d{{4}})m(\d{{2}})$'.format(re.escape(TABLE)))
+
+# PostgreSQL 11 creates row level BEFORE triggers on partitions only, not on the
+# partitioned table, so every partition gets its copy of the trigger of migration 0006
+SEARCH_VECTOR_TRIGGER_SQL = '''
+CREATE TRIGGER moviesapp_comment_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF content ON {table}
+    FOR EACH ROW EXECUTE PROCEDURE moviesapp_comment_search_vector_update()
+'''
+
+
+def month_start(dt):
+    return dt.astimezone(datetime.timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(month):
+    return '{}_y{:04d}m{:02d}'.format(TABLE, month.year, month.month)
+
+
+def partition_month(name):
+    """
+    Returns the month of a partition created by this module, `None` for other tables.
+    """
+    match = PARTITION_NAME_PATTERN.match(name)
+    if match is None:
+        return None
+
+    return datetime.datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=datetime.timezone.utc)
+
+
+def _quote(name):
+    return connection.ops.quote_name(name)
+
+
+def _bound(month):
+    # Bounds of PostgreSQL 11 partitions must be plain literals, parameters are sent with a type cast
+    return "'{}'".format(month.isoformat())
+
+
+def is_partitioned(cursor):
+    cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [TABLE])
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'p'
+
+
+def get_partition_months(cursor):
+    cursor.execute(
+        'SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid '
+        'WHERE i.inhparent = to_regclass(%s)',
+        [TABLE]
+    )
+    return sorted(filter(None, (partition_month(name) for name, in cursor.fetchall())))
+
+
+def _create_partition_table(cursor, parent, month):
+    name = partition_name(month)
+    cursor.execute('CREATE TABLE {} PARTITION OF {} FOR VALUES FROM ({}) TO ({})'.format(
+        _quote(name), _quote(parent), _bound(month), _bound(add_months(month, 1))
+    ))
+    return name
+
+
+def _create_search_vector_trigger(cursor, name):
+    cursor.execute(SEARCH_VECTOR_TRIGGER_SQL.format(table=_quote(name)))
+
+
+def create_partitions(cursor, months):
+    """
+    Creates the missing partitions of the given months, returns their names.
+
+    Comments of those months which ended up in the default partition are moved to the new ones.
+    """
+    existing = set(get_partition_months(cursor))
+
+    created = []
+    for month in months:
+        if month in existing:
+            continue
+
+        condition = 'created_at >= {} AND created_at < {}'.format(_bound(month), _bound(add_months(month, 1)))
+        cursor.execute('SELECT EXISTS (SELECT 1 FROM {} WHERE {})'.format(_quote(DEFAULT_PARTITION), condition))
+        misplaced, = cursor.fetchone()
+
+        if misplaced:
+            # A partition overlapping rows of the default partition cannot be created while it is attached
+            cursor.execute('ALTER TABLE {} DETACH PARTITION {}'.format(_quote(TABLE), _quote(DEFAULT_PARTITION)))
+            name = _create_partition_table(cursor, TABLE, month)
+            _create_search_vector_trigger(cursor, name)
+            cursor.execute('INSERT INTO {} SELECT * FROM {} WHERE {}'.format(
+                _quote(TABLE), _quote(DEFAULT_PARTITION), condition
+            ))
+            cursor.execute('DELETE FROM {} WHERE {}'.format(_quote(DEFAULT_PARTITION), condition))
+            cursor.execute('ALTER TABLE {} ATTACH PARTITION {} DEFAULT'.format(
+                _quote(TABLE), _quote(DEFAULT_PARTITION)
+            ))
+        else:
+            name = _create_partition_table(cursor, TABLE, month)
+            _create_search_vector_trigger(cursor, name)
+
+        created.append(name)
+
+    return created
+
+
+def detach_partitions(cursor, before, archive_schema=None):
+    """
+    Detaches the partitions of months ending before `before`, returns their names.
+
+    Detached partitions stay as standalone tables, moved to `archive_schema` when given.
+    Their comments leave the `/comments/` list, whose version is bumped.
+    """
+    detached = []
+    for month in get_partition_months(cursor):
+        if add_months(month, 1) > before:
+            continue
+
+        name = partition_name(month)
+        cursor.execute('ALTER TABLE {} DETACH PARTITION {}'.format(_quote(TABLE), _quote(name)))
+
+        if archive_schema:
+            cursor.execute('CREATE SCHEMA IF NOT EXISTS {}'.format(_quote(archive_schema)))
+            cursor.execute('ALTER TABLE {} SET SCHEMA {}'.format(_quote(name), _quote(archive_schema)))
+
+        detached.append(name)
+
+    if detached:
+        ListVersion.bump(ListVersion.COMMENTS)
+
+    return detached
+
+
+def convert(cursor, months_ahead):
+    """
+    Replaces the plain comments table with a partitioned one holding the same rows, returns the partition names.
+
+    The table is locked for the duration, the caller is expected to run this in a transaction.
+    """
+    new_table = TABLE + '_partitioned'
+
+    cursor.execute('LOCK TABLE {} IN ACCESS EXCLUSIVE MODE'.format(_quote(TABLE)))
+    cursor.execute('SELECT min(created_at), max(created_at) FROM {}'.format(_quote(TABLE)))
+    first, last = cursor.fetchone()
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    first = month_start(first or now)
+    last = add_months(month_start(max(last or now, now)), months_ahead)
+
+    # Defaults include the `id` sequence, indexes and triggers are created after the rows are copied
+    cursor.execute('CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)'.format(
+        _quote(new_table), _quote(TABLE)
+    ))
+
+    created = []
+    month = first
+    while month <= last:
+        created.append(_create_partition_table(cursor, new_table, month))
+        month = add_months(month, 1)
+
+    cursor.execute('CREATE TABLE {} PARTITION OF {} DEFAULT'.format(_quote(DEFAULT_PARTITION), _quote(new_table)))
+    created.append(DEFAULT_PARTITION)
+
+    cursor.execute('INSERT INTO {} SELECT * FROM {}'.format(_quote(new_table), _quote(TABLE)))
+
+    # The sequence would be dropped together with the table owning it
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    sequence, = cursor.fetchone()
+    cursor.execute('ALTER SEQUENCE {} OWNED BY {}.id'.format(sequence, _quote(new_table)))
+
+    cursor.execute('DROP TABLE {}'.format(_quote(TABLE)))
+    cursor.execute('ALTER TABLE {} RENAME TO {}'.format(_quote(new_table), _quote(TABLE)))
+
+    # Unique constraints of partitioned tables must include the partition key
+    cursor.execute('ALTER TABLE {} ADD CONSTRAINT {} PRIMARY KEY (id, created_at)'.format(
+        _quote(TABLE), _quote(TABLE + '_pkey')
+    ))
+    cursor.execute(
+        'ALTER TABLE {} ADD CONSTRAINT {} FOREIGN KEY (movie_id) REFERENCES {} (id) '
+        'DEFERRABLE INITIALLY DEFERRED'.format(
+            _quote(TABLE), _quote(TABLE + '_movie_id_fk'), _quote(Movie._meta.db_table)
+        )
+    )
+    cursor.execute('CREATE INDEX comment_movie_created_at_idx ON {} (movie_id, created_at)'.format(_quote(TABLE)))
+    cursor.execute('CREATE INDEX comment_search_vector_idx ON {} USING gin (search_vector)'.format(_quote(TABLE)))
+
+    for name in created:
+        _create_search_vector_trigger(cursor, name)
+
+    cursor.execute('ANALYZE {}'.format(_quote(TABLE)))
+
+    return created
@@ -1,15 +1,89 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+
 from rest_framework import serializers
 
+from moviesproject.serializers import SparseFieldsetSerializerMixin
+
 from . import models
+from .cache import TopMoviesCache
+
+
+def create_movies(validated_data):
+    """
+    Saves movies together with their ratings and tags atomically, in a constant number of queries.
+    """
+    movies = []
+    ratings = []
+    for data in validated_data:
+        data = dict(data)
+        ratings.append(data.pop('ratings'))
+        movies.append(models.Movie(**data))
+
+    with transaction.atomic():
+        models.Movie.objects.bulk_create(movies)
+        models.Rating.objects.bulk_create(
+            models.Rating(movie=movie, **rating_data)
+            for movie, movie_ratings in zip(movies, ratings)
+            for rating_data in movie_ratings
+        )
+        models.MovieTag.tag_movies(movies)
+
+        # New movies show up in every top movies ranking
+        transaction.on_commit(TopMoviesCache.invalidate_all)
+
+    return movies
+
+
+def get_or_create_movies(validated_data):
+    """
+    Returns `(movie, created)` for every item, movies already saved under the same IMDb id are reused.
+    """
+    validated_data = list(validated_data)
+
+    movies = models.Movie.objects.in_bulk(
+        [data['imdb_id'] for data in validated_data],
+        field_name='imdb_id'
+    )
+    new_data = {}
+    for data in validated_data:
+        if data['imdb_id'] not in movies:
+            new_data.setdefault(data['imdb_id'], data)
+
+    created = set()
+    if not new_data:
+        return [(movies[data['imdb_id']], False) for data in validated_data]
+
+    try:
+        for movie in create_movies(new_data.values()):
+            movies[movie.imdb_id] = movie
+            created.add(movie.imdb_id)
+
+    except IntegrityError:
+        # Lost a race with a concurrent insert, fall back to saving the movies one by one
+        for imdb_id, data in new_data.items():
+            try:
+                movies[imdb_id], = create_movies([data])
+                created.add(imdb_id)
+            except IntegrityError:
+                movies[imdb_id] = models.Movie.objects.get(imdb_id=imdb_id)
+
+    results = []
+    for data in validated_data:
+        imdb_id = data['imdb_id']
+        results.append((movies[imdb_id], imdb_id in created))
+        created.discard(imdb_id)
+
+    return results
 
 
 class RatingSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Rating
-        fields = ('source', 'value',)
+        fields = ('source', 'value', 'normalized_score',)
 
 
-class MovieListSerializer(serializers.ModelSerializer):
+class MovieListSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     ratings = RatingSerializer(many=True)
 
     class Meta:
@@ -17,16 +91,17 @@ class MovieListSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'actors', 'awards', 'box_office', 'country', 'dvd', 'director', 'genre', 'language', 'metascore', 'plot',
             'poster', 'production', 'rated', 'released', 'runtime', 'title', 'type', 'website', 'writer', 'year',
-            'imdb_id', 'imdb_rating', 'imdb_votes', 'ratings',
+            'imdb_id', 'imdb_rating', 'imdb_votes', 'box_office_usd', 'runtime_minutes', 'comments_count',
+            'last_comment_at', 'ratings',
         )
+        read_only_fields = ('comments_count', 'last_comment_at',)
+        extra_kwargs = {
+            # Movies are deduplicated by their IMDb id when saved, see `get_or_create_movies`
+            'imdb_id': {'validators': []},
+        }
 
     def create(self, validated_data):
-        ratings = validated_data.pop('ratings')
-
-        movie = models.Movie.objects.create(**validated_data)
-
-        for rating_data in ratings:
-            models.Rating.objects.create(movie=movie, **rating_data)
+        movie, = create_movies([validated_data])
         return movie
 
 
@@ -36,6 +111,19 @@ class MovieCreateSerializer(serializers.ModelSerializer):
         fields = ('title',)
 
 
+class MovieBulkCreateSerializer(serializers.Serializer):
+    titles = serializers.ListField(
+        child=serializers.CharField(max_length=200),
+        min_length=1,
+        max_length=settings.MOVIES_BULK_CREATE_MAX_TITLES
+    )
+
+
+class FacetCountSerializer(serializers.Serializer):
+    name = serializers.CharField(source='tag__name')
+    count = serializers.IntegerField()
+
+
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Comment
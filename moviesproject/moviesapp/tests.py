@@ -1,20 +1,57 @@
 import unittest
 import datetime
+import decimal
 import json
+import asyncio
+import threading
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO, StringIO
 from unittest.mock import patch
 
+import httpx
 import requests
 import requests_mock
-
-from django.urls import reverse
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
 from django.utils import timezone
 
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase, APIRequestFactory
 from rest_framework import status
 from rest_framework.serializers import DateTimeField
 
+from moviesproject.api import router
+from moviesproject.metrics import REGISTRY, Histogram, metrics_view
+from moviesproject.parsers import ORJSONParser
+from moviesproject.renderers import ORJSONRenderer
+from moviesproject.routers import PIN_COOKIE_NAME, ReplicaRouter, use_replica
+from moviesproject.singleflight import SingleFlight, AsyncSingleFlight
+from moviesproject.timing import measure
+from moviesapp.benchmarks import legacy_omdb
+from moviesapp.cache import TopMoviesCache
+from moviesapp.management.commands.benchmark_omdb_normalizer import PAYLOADS_PATH
 from moviesapp.omdb import OMDB
+from moviesapp.omdb_async import AsyncOMDB
+from . import async_views
 from . import models
+from . import pagination
+from . import partitions
+from . import serializers
+from . import views
 
 
 BATMAN_OMDB_JSON_RESPONSE = {
@@ -64,11 +101,15 @@ BATMAN_API_JSON_RESPONSE = {
     'poster': 'https://m.media-amazon.com/images/M/MV5BMTYwNjAyODIyMF5BMl5BanBnXkFtZTYwNDMwMDk2._V1_SX300.jpg',
     'production': 'Warner Bros. Pictures',
     'rated': 'PG-13',
-    'ratings': [{'source': 'Internet Movie Database', 'value': '7.6/10'},
-                {'source': 'Metacritic', 'value': '69/100'},
-                {'source': 'Rotten Tomatoes', 'value': '71%'}],
+    'ratings': [{'source': 'Internet Movie Database', 'value': '7.6/10', 'normalized_score': '76.00'},
+                {'source': 'Metacritic', 'value': '69/100', 'normalized_score': '69.00'},
+                {'source': 'Rotten Tomatoes', 'value': '71%', 'normalized_score': '71.00'}],
     'released': '1989-06-23',
     'runtime': '126 min',
+    'box_office_usd': None,
+    'runtime_minutes': 126,
+    'comments_count': 0,
+    'last_comment_at': None,
     'title': 'Batman',
     'type': 'movie',
     'website': 'N/A',
@@ -95,10 +136,22 @@ def remove_ids(obj):
     return remove_key(obj, 'id')
 
 
+def batman_api_response(movie):
+    return dict(BATMAN_API_JSON_RESPONSE, imdb_id=movie.imdb_id)
+
+
 def dt_to_rest_repr(dt):
     return DateTimeField().to_representation(dt)
 
 
+def get_links(response):
+    links = {}
+    for link in filter(None, response.get('Link', '').split(', ')):
+        url, rel = link.split('; ')
+        links[rel[len('rel="'):-1]] = url[1:-1]
+    return links
+
+
 class PatchServerTime(object):
     def __init__(self, desired_time=None):
         if desired_time is None:
@@ -118,9 +171,20 @@ class PatchServerTime(object):
 patch_server_time = PatchServerTime
 
 
+def clear_omdb_cache():
+    caches[settings.OMDB_CACHE_ALIAS].clear()
+
+
+def clear_top_movies_cache():
+    caches[settings.TOP_MOVIES_CACHE_ALIAS].clear()
+
+
 class OMDBClientTests(unittest.TestCase):
     maxDiff = None
 
+    def setUp(self):
+        clear_omdb_cache()
+
     def test_to_snake_case(self):
         self.assertEqual(
             OMDB._to_snake_case('Title'),
@@ -161,6 +225,82 @@ class OMDBClientTests(unittest.TestCase):
             }
         )
 
+    def test_normalize(self):
+        self.assertEqual(
+            OMDB._normalize({
+                'Released': '1 Jan 2000',
+                'DVD': '25 Mar 1997',
+                'imdbVotes': '1,311,189',
+                'Metascore': '69',
+                'NewField': {'NestedKey': [{'DeepKey': 1}]},
+                'Ratings': [{'Source': 'Metacritic', 'Value': '69/100'}],
+            }),
+            {
+                'released': datetime.date(2000, 1, 1),
+                'dvd': '25 Mar 1997',
+                'imdb_votes': 1311189,
+                'metascore': 69,
+                'new_field': {'nested_key': [{'deep_key': 1}]},
+                'ratings': [{'source': 'Metacritic', 'value': '69/100'}],
+            }
+        )
+
+    def test_normalize_unusual_formats(self):
+        self.assertEqual(
+            OMDB._normalize({'Released': '2000-01-31', 'imdbVotes': '1 311 189'}),
+            {'released': datetime.date(2000, 1, 31), 'imdb_votes': 1311189}
+        )
+
+    def test_convert_data(self):
+        self.assertEqual(
+            OMDB._convert_data({
+                'box_office': '$251,188,924',
+                'runtime': '126 min',
+                'ratings': [
+                    {'source': 'Internet Movie Database', 'value': '7.6/10'},
+                    {'source': 'Rotten Tomatoes', 'value': '71%'},
+                    {'source': 'Metacritic', 'value': '69/100'},
+                    {'source': 'Unknown', 'value': 'N/A'},
+                ],
+            }),
+            {
+                'box_office': '$251,188,924',
+                'box_office_usd': 251188924,
+                'runtime': '126 min',
+                'runtime_minutes': 126,
+                'ratings': [
+                    {'source': 'Internet Movie Database', 'value': '7.6/10', 'normalized_score': decimal.Decimal('76')},
+                    {'source': 'Rotten Tomatoes', 'value': '71%', 'normalized_score': decimal.Decimal('71')},
+                    {'source': 'Metacritic', 'value': '69/100', 'normalized_score': decimal.Decimal('69')},
+                    {'source': 'Unknown', 'value': 'N/A', 'normalized_score': None},
+                ],
+            }
+        )
+
+    def test_split_names(self):
+        self.assertEqual(
+            models.split_names('Bob Kane (Batman characters), Sam Hamm (story), Sam Hamm (screenplay)'),
+            ['Bob Kane', 'Sam Hamm']
+        )
+        self.assertEqual(models.split_names('N/A'), [])
+        self.assertEqual(models.split_names(''), [])
+
+    def test_convert_data_not_reported(self):
+        self.assertEqual(
+            OMDB._convert_data({'box_office': 'N/A', 'runtime': 'N/A'}),
+            {'box_office': 'N/A', 'box_office_usd': None, 'runtime': 'N/A', 'runtime_minutes': None}
+        )
+
+    def test_normalize_same_as_previous_implementation(self):
+        with open(PAYLOADS_PATH, encoding='utf-8') as payloads_file:
+            payloads = json.load(payloads_file)
+
+        for payload in payloads:
+            self.assertEqual(
+                OMDB._parse_response(payload['Title'], payload),
+                OMDB._convert_data(legacy_omdb.parse_response(payload))
+            )
+
     def test_get_movie_successfully(self):
         with requests_mock.mock() as m:
             m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
@@ -186,11 +326,14 @@ class OMDBClientTests(unittest.TestCase):
                 'poster': 'https://m.media-amazon.com/images/M/MV5BMTYwNjAyODIyMF5BMl5BanBnXkFtZTYwNDMwMDk2._V1_SX300.jpg',
                 'production': 'Warner Bros. Pictures',
                 'rated': 'PG-13',
-                'ratings': [{'source': 'Internet Movie Database', 'value': '7.6/10'},
-                            {'source': 'Rotten Tomatoes', 'value': '71%'},
-                            {'source': 'Metacritic', 'value': '69/100'}],
+                'ratings': [{'source': 'Internet Movie Database', 'value': '7.6/10',
+                             'normalized_score': decimal.Decimal('76.00')},
+                            {'source': 'Rotten Tomatoes', 'value': '71%', 'normalized_score': decimal.Decimal('71.00')},
+                            {'source': 'Metacritic', 'value': '69/100', 'normalized_score': decimal.Decimal('69.00')}],
                 'released': datetime.date(1989, 6, 23),
                 'runtime': '126 min',
+                'box_office_usd': None,
+                'runtime_minutes': 126,
                 'title': 'Batman',
                 'type': 'movie',
                 'website': 'N/A',
@@ -221,132 +364,1383 @@ class OMDBClientTests(unittest.TestCase):
             with self.assertRaises(requests.exceptions.HTTPError):
                 OMDB.get_movie_by_title('batman')
 
+    def test_get_movie_uses_shared_session(self):
+        with requests_mock.mock() as m:
+            m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
 
-def create_batman_movie():
-    data = BATMAN_API_JSON_RESPONSE.copy()
-    ratings = data.pop('ratings')
+            OMDB.get_movie_by_title('batman')
 
-    movie = models.Movie.objects.create(
-        **data
-    )
-    for rating_data in ratings:
-        models.Rating.objects.create(movie=movie, **rating_data)
-    return movie
+        self.assertEqual(
+            m.last_request.timeout,
+            (settings.OMDB_CONNECT_TIMEOUT, settings.OMDB_READ_TIMEOUT)
+        )
+        self.assertIs(OMDB.get_session(), OMDB.get_session())
 
+        retry = OMDB.get_session().get_adapter(OMDB.API_BASE_URL).max_retries
+        self.assertEqual(retry.total, settings.OMDB_RETRIES)
+        self.assertIn(503, retry.status_forcelist)
+        self.assertIn(429, retry.status_forcelist)
 
-def create_comment(movie, content):
-    comment = models.Comment.objects.create(
-        movie=movie,
-        content=content
-    )
-    return comment
+    def test_get_movie_cached(self):
+        with requests_mock.mock() as m:
+            m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
 
+            first = OMDB.get_movie_by_title('Batman')
+            second = OMDB.get_movie_by_title('  batman ')
 
-class MovieListCreateTests(APITestCase):
-    maxDiff = None
-    url = reverse('api:movie-list')
+        self.assertEqual(m.call_count, 1)
+        self.assertEqual(first, second)
 
-    def test_put_is_not_allowed(self):
-        response = self.client.put(self.url)
+    def test_get_movie_not_found_cached(self):
+        with requests_mock.mock() as m:
+            m.get('http://www.omdbapi.com/', json={'Response': 'False'})
+
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    OMDB.get_movie_by_title('movie title that for sure will not be found')
+
+        self.assertEqual(m.call_count, 1)
+
+    def test_get_movie_error_not_cached(self):
+        with requests_mock.mock() as m:
+            m.get('http://www.omdbapi.com/', status_code=503)
+
+            with self.assertRaises(requests.exceptions.HTTPError):
+                OMDB.get_movie_by_title('batman')
+
+            m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
+
+            OMDB.get_movie_by_title('batman')
+
+        self.assertEqual(m.call_count, 2)
+
+
+class ConditionalListTests(APITestCase):
+    def test_movies_not_modified(self):
+        create_batman_movie()
+        url = reverse('api:movie-list')
+
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
 
         self.assertEqual(
             response.status_code,
-            status.HTTP_405_METHOD_NOT_ALLOWED
+            status.HTTP_304_NOT_MODIFIED
         )
+        self.assertEqual(response.content, b'')
 
-    def test_delete_is_not_allowed(self):
-        response = self.client.delete(self.url)
+        # Other query parameters and representations get other tags
+        self.assertNotEqual(self.client.get(url, {'page_size': 1})['ETag'], etag)
+        self.assertNotEqual(self.client.get(url, {'format': 'api'})['ETag'], etag)
+
+        create_batman_movie()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
 
         self.assertEqual(
             response.status_code,
-            status.HTTP_405_METHOD_NOT_ALLOWED
+            status.HTTP_200_OK
         )
+        self.assertEqual(len(response.json()), 2)
 
-    def test_list_empty(self):
-        with self.assertNumQueries(1):
-            response = self.client.get(self.url)
+    def test_movies_modified_by_comment(self):
+        movie = create_batman_movie()
+        url = reverse('api:movie-list')
+
+        etag = self.client.get(url)['ETag']
+
+        create_comment(movie, 'First comment!')
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
 
         self.assertEqual(
             response.status_code,
             status.HTTP_200_OK
         )
+        self.assertEqual(response.json()[0]['comments_count'], 1)
+
+    def test_comments_not_modified_since(self):
+        movie = create_batman_movie()
+        url = reverse('api:comment-list')
+
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+            create_comment(movie, 'First comment!')
+
+        response = self.client.get(url)
+
+        self.assertEqual(response['Last-Modified'], 'Mon, 01 Jul 2019 12:00:00 GMT')
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+
         self.assertEqual(
-            response.json(),
-            []
+            response.status_code,
+            status.HTTP_304_NOT_MODIFIED
         )
 
-    def test_list_single(self):
-        create_batman_movie()
+        with patch_server_time(datetime.datetime(2019, 7, 1, 13, tzinfo=datetime.timezone.utc)):
+            create_comment(movie, 'Second comment.')
 
-        with self.assertNumQueries(2):
-            response = self.client.get(self.url)
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jul 2019 12:00:00 GMT')
 
         self.assertEqual(
             response.status_code,
             status.HTTP_200_OK
         )
-        self.assertEqual(
-            remove_ids(response.json()),
-            [BATMAN_API_JSON_RESPONSE]
-        )
 
-    def test_list_many(self):
-        create_batman_movie()
-        create_batman_movie()
-        create_batman_movie()
+    def test_comments_modified_by_list_version(self):
+        movie = create_batman_movie()
+        url = reverse('api:comment-list')
 
-        with self.assertNumQueries(2):
-            response = self.client.get(self.url)
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+            create_comment(movie, 'First comment!')
+
+        response = self.client.get(url)
+        etag = response['ETag']
+
+        # Bumped when partitions are detached, the newest comment stays the same
+        with patch_server_time(datetime.datetime(2019, 7, 2, 12, tzinfo=datetime.timezone.utc)):
+            models.ListVersion.bump(models.ListVersion.COMMENTS)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
 
         self.assertEqual(
             response.status_code,
             status.HTTP_200_OK
         )
+        self.assertEqual(response['Last-Modified'], 'Tue, 02 Jul 2019 12:00:00 GMT')
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jul 2019 12:00:00 GMT')
+
         self.assertEqual(
-            remove_ids(response.json()),
-            [BATMAN_API_JSON_RESPONSE, BATMAN_API_JSON_RESPONSE, BATMAN_API_JSON_RESPONSE]
+            response.status_code,
+            status.HTTP_200_OK
         )
 
-    def test_create_first(self):
-        data = {'title': 'batman'}
+    def test_top_movies_not_modified(self):
+        movie = create_batman_movie()
+        url = reverse('api:top-movies-list')
+        params = {
+            'comments_after': '2019-06-30',
+            'comments_before': '2019-07-31'
+        }
 
-        with self.assertNumQueries(5):
-            with requests_mock.mock() as m:
-                m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
+        etag = self.client.get(url, params)['ETag']
 
-                response = self.client.post(self.url, data, format='json')
+        with self.assertNumQueries(1):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
 
         self.assertEqual(
             response.status_code,
-            status.HTTP_201_CREATED
+            status.HTTP_304_NOT_MODIFIED
         )
+
+        create_comment(movie, 'First comment!')
+
+        response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
         self.assertEqual(
-            remove_ids(response.json()),
-            BATMAN_API_JSON_RESPONSE
+            response.status_code,
+            status.HTTP_200_OK
         )
 
-        with self.assertNumQueries(2):
-            response = self.client.get(self.url)
+
+    def test_top_movies_modified_by_movie(self):
+        movie = create_batman_movie()
+        url = reverse('api:top-movies-list')
+        params = {
+            'comments_after': '2019-06-30',
+            'comments_before': '2019-07-31'
+        }
+
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+            create_comment(movie, 'First comment!')
+
+        response = self.client.get(url, params)
+
+        self.assertNotIn('Last-Modified', response)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            serializers.create_movies([dict(BATMAN_API_JSON_RESPONSE, imdb_id='tt0103776')])
+
+        response = self.client.get(url, params, HTTP_IF_MODIFIED_SINCE='Mon, 01 Jul 2019 12:00:00 GMT')
 
         self.assertEqual(
             response.status_code,
             status.HTTP_200_OK
         )
+        self.assertEqual(len(response.json()), 2)
+
+class SingleFlightTests(unittest.TestCase):
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def function(value):
+            calls.append(value)
+            started.set()
+            release.wait()
+            return value
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            leader = executor.submit(flight.do, 'key', function, 'first')
+            started.wait()
+            followers = [executor.submit(flight.do, 'key', function, 'other') for _ in range(2)]
+            time.sleep(0.05)
+            release.set()
+
+            results = [future.result() for future in [leader] + followers]
+
+        self.assertEqual(calls, ['first'])
+        self.assertEqual(results, [('first', False), ('first', True), ('first', True)])
+
+    def test_exception_propagated(self):
+        flight = SingleFlight()
+
+        with self.assertRaises(ValueError):
+            flight.do('key', int, 'not a number')
+
+        self.assertEqual(flight.do('key', int, '1'), (1, False))
+
+    def test_async_calls_share_result(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def function(value):
+            calls.append(value)
+            await asyncio.sleep(0.01)
+            return value
+
+        async def run():
+            return await asyncio.gather(*[flight.do('key', function, value) for value in ('first', 'other')])
+
         self.assertEqual(
-            remove_ids(response.json()),
-            [BATMAN_API_JSON_RESPONSE]
+            async_to_sync(run)(),
+            [('first', False), ('first', True)]
         )
+        self.assertEqual(calls, ['first'])
 
-    def test_create_another(self):
+
+class ORJSONTests(unittest.TestCase):
+    def test_render_same_as_json_renderer(self):
+        data = [
+            {
+                'imdb_rating': decimal.Decimal('7.6'),
+                'released': datetime.date(1989, 6, 23),
+                'created_at': datetime.datetime(2019, 7, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+                'shown_at': datetime.datetime(2019, 7, 1, 14, 30, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+                'title': 'Amélie',
+                'plot': 'First line\u2028second line\u2029next paragraph',
+                'ratings': [],
+                'poster': None,
+            },
+        ]
+
+        self.assertEqual(
+            ORJSONRenderer().render(data),
+            JSONRenderer().render(data)
+        )
+
+    def test_parse(self):
+        data = ORJSONParser().parse(BytesIO('{"title": "Amélie", "ids": [1, 2]}'.encode('utf-8')))
+
+        self.assertEqual(data, {'title': 'Amélie', 'ids': [1, 2]})
+
+    def test_parse_invalid(self):
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"title": '))
+
+
+class AsyncURLConf(object):
+    """
+    URLconf of `MOVIES_ASYNC_CREATE`, which is read once when the project URLconf is imported.
+    """
+    urlpatterns = [
+        path('', include(
+            ([path('movies/', async_views.movie_list_create, name='movie-list')] + router.urls, 'moviesproject'),
+            namespace='api'
+        )),
+        path('metrics', metrics_view, name='metrics'),
+    ]
+
+
+class TimingTests(APITestCase):
+    def test_server_timing(self):
         create_batman_movie()
 
-        data = {'title': 'batman'}
+        response = self.client.get(reverse('api:movie-list'))
+
+        phases = dict(
+            (entry.split(';')[0], entry.split(';')[1:])
+            for entry in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(set(phases), {'db', 'serialize', 'render', 'total'})
+        self.assertEqual(phases['db'][1], 'desc="3 queries"')
+
+    def test_server_timing_omdb(self):
+        clear_omdb_cache()
+
+        with requests_mock.mock() as m:
+            m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
+
+            response = self.client.post(reverse('api:movie-list'), {'title': 'batman'}, format='json')
+
+        self.assertIn('omdb;dur=', response['Server-Timing'])
+
+    def test_server_timing_async(self):
+        create_batman_movie()
+
+        response = async_to_sync(self.async_client.get)(reverse('api:movie-list'))
+
+        phases = dict(
+            (entry.split(';')[0], entry.split(';')[1:])
+            for entry in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(set(phases), {'db', 'serialize', 'render', 'total'})
+        self.assertEqual(phases['db'][1], 'desc="3 queries"')
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    def test_server_timing_async_view(self):
+        clear_omdb_cache()
+        client, sent = mock_async_omdb((200, BATMAN_OMDB_JSON_RESPONSE))
+
+        with client:
+            response = async_to_sync(self.async_client.post)(
+                reverse('api:movie-list'), {'title': 'batman'}, content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('omdb;dur=', response['Server-Timing'])
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+    def test_measure_outside_request(self):
+        with measure('omdb'):
+            pass
+
+    def test_metrics(self):
+        self.client.get(reverse('api:movie-list'))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(
+            response['Content-Type'],
+            'text/plain; version=0.0.4; charset=utf-8'
+        )
+
+        lines = response.content.decode('utf-8').splitlines()
+        self.assertIn('# TYPE http_request_phase_duration_seconds histogram', lines)
+        self.assertIn('# TYPE top_movies_cache_lookups_total counter', lines)
+        self.assertTrue(any(
+            line.startswith('http_request_db_queries_bucket{route="api:movie-list",method="GET",le="2.0"}')
+            for line in lines
+        ))
+
+
+class BenchmarkApiTests(APITestCase):
+    def test_benchmark(self):
+        output = StringIO()
+        call_command(
+            'benchmark_api', movies=3, comments=20, requests=2, warmup=0, stdout=output, stderr=StringIO()
+        )
+
+        results = json.loads(output.getvalue())
+
+        self.assertEqual(results['dataset']['movies'], 3)
+        self.assertEqual(
+            set(results['scenarios']),
+            {'movies', 'movies_sparse', 'movies_by_genre', 'movies_facets', 'comments', 'comments_by_movie',
+             'comments_search', 'top_movies', 'top_movies_cached', 'movies_create'}
+        )
+        self.assertEqual(results['scenarios']['movies_create']['requests'], 2)
+
+        # The dataset is rolled back
+        self.assertFalse(models.Movie.objects.exists())
+
+
+class ReconcileCommentCountersTests(APITestCase):
+    def test_reconcile(self):
+        movies = [create_batman_movie() for _ in range(3)]
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+            for movie in movies:
+                create_comment(movie, 'First comment!')
+
+        models.Movie.objects.filter(pk=movies[0].pk).update(comments_count=5)
+        models.Movie.objects.filter(pk=movies[2].pk).update(last_comment_at=None)
+
+        output = StringIO()
+        call_command('reconcile_comment_counters', batch_size=2, verbosity=2, stdout=output)
+
+        self.assertEqual(
+            output.getvalue().splitlines(),
+            ['fixed movie {}'.format(movies[0].id), 'fixed movie {}'.format(movies[2].id), 'checked: 3, fixed: 2']
+        )
+        self.assertEqual(
+            list(models.Movie.objects.values_list('comments_count', 'last_comment_at')),
+            [(1, datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc))] * 3
+        )
+
+
+    def test_reconcile_changes_list_etag(self):
+        movie = create_batman_movie()
+        create_comment(movie, 'First comment!')
+        models.Movie.objects.filter(pk=movie.pk).update(comments_count=5)
+
+        url = reverse('api:movie-list')
+        etag = self.client.get(url)['ETag']
+
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+            status.HTTP_304_NOT_MODIFIED
+        )
+
+        call_command('reconcile_comment_counters', stdout=StringIO())
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(response.json()[0]['comments_count'], 1)
+
+class ReplicaRoutingTests(APITestCase):
+    movies_url = reverse('api:movie-list')
+    comments_url = reverse('api:comment-list')
+
+    def setUp(self):
+        clear_omdb_cache()
+        clear_top_movies_cache()
+
+    def get_routed_reads(self, request):
+        """
+        Returns the response of `request` and the databases the router picked for its reads, `None` for the primary.
+        """
+        routed = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            routed.append(alias)
+            return alias
+
+        with patch.object(ReplicaRouter, 'db_for_read', record):
+            response = request()
+            if response.streaming:
+                b''.join(response.streaming_content)
+
+        return response, set(routed)
+
+    # The primary stands in for a replica, reads sent to it are routed explicitly instead of by default
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_lists_read_from_replica(self):
+        movie = create_batman_movie()
+        create_comment(movie, 'First comment!')
+
+        for url, params in ((self.movies_url, {}),
+                            (self.movies_url, {'format': 'ndjson'}),
+                            (self.comments_url, {}),
+                            (reverse('api:top-movies-list'), {'comments_after': '2019-06-30',
+                                                              'comments_before': '2019-07-31'})):
+            response, routed = self.get_routed_reads(lambda: self.client.get(url, params))
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_200_OK
+            )
+            self.assertEqual(routed, {'default'})
+
+    @override_settings(DATABASE_REPLICAS=['default'], DATABASE_REPLICA_PIN_SECONDS=30)
+    def test_writes_pin_client_to_primary(self):
+        movie = create_batman_movie()
+
+        response, routed = self.get_routed_reads(
+            lambda: self.client.post(self.comments_url, {'movie': movie.id, 'content': 'First comment!'}, format='json')
+        )
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+        self.assertEqual(routed, {None})
+        self.assertEqual(response.cookies[PIN_COOKIE_NAME]['max-age'], 30)
+
+        # The client sends the cookie back and reads its own comment from the primary
+        response, routed = self.get_routed_reads(lambda: self.client.get(self.comments_url))
+
+        self.assertEqual(len(response.json()), 1)
+        self.assertEqual(routed, {None})
+
+        self.client.cookies.clear()
+
+        response, routed = self.get_routed_reads(lambda: self.client.get(self.comments_url))
+
+        self.assertEqual(routed, {'default'})
+
+    @override_settings(DATABASE_REPLICAS=['default'])
+    def test_top_movies_not_cached_from_replica(self):
+        url = reverse('api:top-movies-list')
+        params = {'comments_after': '2019-06-30', 'comments_before': '2019-07-31'}
+        create_batman_movie()
+
+        self.assertEqual(self.client.get(url, params)['X-Cache'], 'MISS')
+        self.assertEqual(self.client.get(url, params)['X-Cache'], 'MISS')
+
+    def test_top_movies_cache_bypassed_when_pinned(self):
+        url = reverse('api:top-movies-list')
+        params = {'comments_after': '2019-06-30', 'comments_before': '2019-07-31'}
+        movie = create_batman_movie()
+
+        self.client.get(url, params)
+        self.assertEqual(self.client.get(url, params)['X-Cache'], 'HIT')
+
+        with self.settings(DATABASE_REPLICAS=['default']):
+            self.client.cookies[PIN_COOKIE_NAME] = '1'
+
+            with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+                create_comment(movie, 'First comment!')
+
+            response, routed = self.get_routed_reads(lambda: self.client.get(url, params))
+
+        self.assertEqual(response['X-Cache'], 'BYPASS')
+        self.assertEqual(routed, {None})
+        self.assertEqual(response.json(), [{'movie_id': movie.id, 'rank': 1, 'total_comments': 1}])
+
+    def test_without_replicas(self):
+        movie = create_batman_movie()
+
+        response = self.client.post(self.comments_url, {'movie': movie.id, 'content': 'First comment!'}, format='json')
+
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+
+        response, routed = self.get_routed_reads(lambda: self.client.get(self.comments_url))
+
+        self.assertEqual(routed, {None})
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    def test_router(self):
+        router = ReplicaRouter()
+
+        with use_replica('replica_0'):
+            self.assertEqual(router.db_for_read(models.Movie), 'replica_0')
+            self.assertEqual(router.db_for_write(models.Movie), 'default')
+
+        self.assertIsNone(router.db_for_read(models.Movie))
+        self.assertTrue(router.allow_migrate('default', 'moviesapp'))
+        self.assertFalse(router.allow_migrate('replica_0', 'moviesapp'))
+
+
+class CommentPartitionTests(unittest.TestCase):
+    def test_months(self):
+        # Months start in UTC, whatever the time zone of the comments
+        month = partitions.month_start(
+            datetime.datetime(2019, 12, 31, 23, 30, tzinfo=datetime.timezone(-datetime.timedelta(hours=1)))
+        )
+
+        self.assertEqual(month, datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(partitions.add_months(month, -1), datetime.datetime(2019, 12, 1, tzinfo=datetime.timezone.utc))
+        self.assertEqual(partitions.add_months(month, 14), datetime.datetime(2021, 3, 1, tzinfo=datetime.timezone.utc))
+
+    def test_partition_names(self):
+        month = datetime.datetime(2019, 7, 1, tzinfo=datetime.timezone.utc)
+
+        self.assertEqual(partitions.partition_name(month), 'moviesapp_comment_y2019m07')
+        self.assertEqual(partitions.partition_month('moviesapp_comment_y2019m07'), month)
+        self.assertIsNone(partitions.partition_month('moviesapp_comment_default'))
+
+    @unittest.skipIf(connection.vendor == 'postgresql', 'partitioning is supported')
+    def test_command_requires_postgresql(self):
+        with self.assertRaisesRegex(CommandError, 'requires PostgreSQL'):
+            call_command('partition_comments', stdout=StringIO())
+
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'partitioning requires PostgreSQL')
+class CommentPartitionConversionTests(APITestCase):
+    url = reverse('api:comment-list')
+
+    def test_convert_and_detach(self):
+        movie = create_batman_movie()
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+            first_comment = create_comment(movie, 'Great movie before the conversion')
+
+        # Foreign key checks of the rows above would otherwise be pending until the end of the test, blocking DDL
+        with connection.cursor() as cursor:
+            cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+        output = StringIO()
+        call_command('partition_comments', convert=True, ahead=1, stdout=output)
+
+        self.assertIn('created moviesapp_comment_y2019m07', output.getvalue().splitlines())
+        self.assertIn('created moviesapp_comment_default', output.getvalue().splitlines())
+
+        with connection.cursor() as cursor:
+            self.assertTrue(partitions.is_partitioned(cursor))
+
+        with patch_server_time(datetime.datetime(2019, 8, 15, 12, tzinfo=datetime.timezone.utc)):
+            second_comment = create_comment(movie, 'Great movie after the conversion')
+
+        # Ids keep coming from the same sequence, search vectors from the triggers of the partitions
+        self.assertGreater(second_comment.id, first_comment.id)
+
+        response = self.client.get(self.url, {'search': 'great'})
+
+        self.assertEqual(
+            sorted(comment['content'] for comment in response.json()),
+            ['Great movie after the conversion', 'Great movie before the conversion']
+        )
+        self.assertEqual(models.Movie.objects.get().comments_count, 2)
+
+        etag = self.client.get(self.url)['ETag']
+
+        with patch_server_time(datetime.datetime(2019, 9, 10, tzinfo=datetime.timezone.utc)):
+            output = StringIO()
+            call_command('partition_comments', retention=1, stdout=output)
+
+        self.assertIn('detached moviesapp_comment_y2019m07', output.getvalue().splitlines())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            [comment['content'] for comment in response.json()],
+            ['Great movie after the conversion']
+        )
+
+class HistogramTests(unittest.TestCase):
+    def test_collect(self):
+        histogram = Histogram('test_seconds', 'Test histogram', labelnames=('route',), buckets=(0.1, 1))
+        REGISTRY.remove(histogram)
+
+        histogram.observe(0.05, route='a')
+        histogram.observe(0.5, route='a')
+        histogram.observe(5, route='a')
+
+        self.assertEqual(
+            list(histogram.collect()),
+            [
+                '# HELP test_seconds Test histogram',
+                '# TYPE test_seconds histogram',
+                'test_seconds_bucket{route="a",le="0.1"} 1',
+                'test_seconds_bucket{route="a",le="1.0"} 2',
+                'test_seconds_bucket{route="a",le="+Inf"} 3',
+                'test_seconds_sum{route="a"} 5.55',
+                'test_seconds_count{route="a"} 3',
+            ]
+        )
+
+
+def create_batman_movie():
+    data = BATMAN_API_JSON_RESPONSE.copy()
+    ratings = data.pop('ratings')
+
+    # IMDb ids are unique, copies of the movie get made up ones
+    copies = models.Movie.objects.filter(title=data['title']).count()
+    if copies:
+        data['imdb_id'] = '{}-{}'.format(data['imdb_id'], copies)
+
+    movie = models.Movie.objects.create(
+        **data
+    )
+    for rating_data in ratings:
+        models.Rating.objects.create(movie=movie, **rating_data)
+    models.MovieTag.tag_movies([movie])
+    return movie
+
+
+def create_comment(movie, content):
+    comment = models.Comment.objects.create(
+        movie=movie,
+        content=content
+    )
+    return comment
+
+
+class MovieListCreateTests(APITestCase):
+    maxDiff = None
+    url = reverse('api:movie-list')
+
+    def setUp(self):
+        clear_omdb_cache()
+
+    def test_put_is_not_allowed(self):
+        response = self.client.put(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    def test_delete_is_not_allowed(self):
+        response = self.client.delete(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    def test_list_empty(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            response.json(),
+            []
+        )
+
+    def test_list_single(self):
+        create_batman_movie()
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            remove_ids(response.json()),
+            [BATMAN_API_JSON_RESPONSE]
+        )
+
+    def test_list_many(self):
+        movies = [create_batman_movie() for _ in range(3)]
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            remove_ids(response.json()),
+            [batman_api_response(movie) for movie in movies]
+        )
+
+    def test_list_paginated(self):
+        movies = [create_batman_movie() for _ in range(5)]
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'page_size': 2})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[0].id, movies[1].id]
+        )
+        links = get_links(response)
+        self.assertNotIn('prev', links)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(links['next'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[2].id, movies[3].id]
+        )
+        links = get_links(response)
+
+        response = self.client.get(links['next'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[4].id]
+        )
+        self.assertNotIn('next', get_links(response))
+
+        response = self.client.get(links['prev'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[0].id, movies[1].id]
+        )
+        self.assertNotIn('prev', get_links(response))
+
+    def test_export_ndjson(self):
+        movies = [create_batman_movie() for _ in range(3)]
+
+        with patch.object(views.MovieViewset, 'export_chunk_size', 2):
+            response = self.client.get(self.url, {'format': 'ndjson'})
+
+            self.assertEqual(
+                response.status_code,
+                status.HTTP_200_OK
+            )
+            self.assertEqual(
+                response['Content-Type'],
+                'application/x-ndjson'
+            )
+
+            with self.assertNumQueries(3):
+                content = b''.join(response.streaming_content)
+
+        self.assertEqual(
+            remove_ids([json.loads(line) for line in content.splitlines()]),
+            [batman_api_response(movie) for movie in movies]
+        )
+
+    def test_list_same_as_model_serializer(self):
+        movies = [create_batman_movie() for _ in range(3)]
+        models.Rating.objects.filter(movie=movies[1]).delete()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.content,
+            JSONRenderer().render(serializers.MovieListSerializer(movies, many=True).data)
+        )
+
+    def test_list_sparse_fields(self):
+        movie = create_batman_movie()
+
+        # Ratings are not prefetched and only the picked columns are selected
+        with self.assertNumQueries(2) as captured:
+            response = self.client.get(self.url, {'fields': 'id,title,year,imdb_rating'})
+
+        self.assertEqual(
+            response.json(),
+            [{'id': movie.id, 'title': 'Batman', 'year': 1989, 'imdb_rating': '7.6'}]
+        )
+        self.assertNotIn('"plot"', captured.captured_queries[-1]['sql'])
+
+    def test_list_excluded_fields(self):
+        movie = create_batman_movie()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'exclude': 'plot,ratings'})
+
+        expected = dict(batman_api_response(movie), id=movie.id)
+        del expected['plot']
+        del expected['ratings']
+
+        self.assertEqual(
+            response.json(),
+            [expected]
+        )
+
+    def test_list_unknown_fields(self):
+        response = self.client.get(self.url, {'fields': 'id,budget'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            response.json(),
+            {'fields': ['Unknown fields: budget.']}
+        )
+
+    def test_export_ndjson_sparse_fields(self):
+        movies = [create_batman_movie() for _ in range(2)]
+
+        response = self.client.get(self.url, {'format': 'ndjson', 'fields': 'id,ratings'})
+
+        with self.assertNumQueries(2):
+            content = b''.join(response.streaming_content)
+
+        self.assertEqual(
+            [json.loads(line) for line in content.splitlines()],
+            [{'id': movie.id, 'ratings': batman_api_response(movie)['ratings']} for movie in movies]
+        )
+
+    def test_list_search(self):
+        first_movie = create_batman_movie()
+        second_movie = create_batman_movie()
+        models.Movie.objects.filter(pk=second_movie.pk).update(
+            title='Inception', director='Christopher Nolan', actors='Leonardo DiCaprio, Joseph Gordon-Levitt',
+            genre='Action, Adventure, Sci-Fi', plot='A thief who steals corporate secrets through dreams.'
+        )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url, {'search': 'DiCaprio'})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [second_movie.id]
+        )
+
+        response = self.client.get(self.url, {'search': 'Batman'})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [first_movie.id]
+        )
+
+    def test_list_search_paginated(self):
+        movies = [create_batman_movie() for _ in range(3)]
+
+        response = self.client.get(self.url, {'search': 'Batman', 'page_size': 2})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[0].id, movies[1].id]
+        )
+
+        response = self.client.get(get_links(response)['next'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[2].id]
+        )
+        self.assertNotIn('next', get_links(response))
+
+    def test_list_invalid_cursor(self):
+        response = self.client.get(self.url, {'cursor': 'invalid'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_404_NOT_FOUND
+        )
+
+    def test_list_comment_counters(self):
+        movies = [create_batman_movie() for _ in range(3)]
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)) as patched_time:
+            create_comment(movies[1], 'First comment!')
+            create_comment(movies[1], 'Second comment.')
+            create_comment(movies[2], 'Third comment.')
+
+        # Counters are plain columns of the movie, no comments are counted
+        with self.assertNumQueries(3) as captured:
+            response = self.client.get(self.url, {'ordering': '-comments_count', 'page_size': 2})
+
+        self.assertNotIn('moviesapp_comment', captured.captured_queries[1]['sql'])
+        self.assertEqual(
+            [(movie['id'], movie['comments_count'], movie['last_comment_at']) for movie in response.json()],
+            [(movies[1].id, 2, dt_to_rest_repr(patched_time)), (movies[2].id, 1, dt_to_rest_repr(patched_time))]
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(get_links(response)['next'])
+
+        self.assertEqual(
+            [(movie['id'], movie['comments_count'], movie['last_comment_at']) for movie in response.json()],
+            [(movies[0].id, 0, None)]
+        )
+
+        # Both keys descending, so that the `(comments_count, id)` index is scanned backward
+        self.assertEqual(
+            pagination.MoviePagination().get_ordering(models.Movie.objects.order_by('-comments_count')),
+            ('-comments_count', '-id')
+        )
+        sql = captured.captured_queries[1]['sql']
+        self.assertRegex(sql, r'ORDER BY \S+ DESC, \S+ DESC LIMIT')
+        self.assertIn('"moviesapp_movie"."id" < {}'.format(movies[2].id), sql)
+
+    def test_list_tags(self):
+        first_movie = create_batman_movie()
+        second_movie = create_batman_movie()
+        models.Movie.objects.filter(pk=second_movie.pk).update(
+            genre='Action, Drama', actors='Michael Keaton, Kim Basinger', writer='Sam Hamm (screenplay)'
+        )
+        models.MovieTag.objects.filter(movie=second_movie).delete()
+        models.MovieTag.tag_movies([models.Movie.objects.get(pk=second_movie.pk)])
+
+        response = self.client.get(self.url, {'genre': 'Action'})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [first_movie.id, second_movie.id]
+        )
+
+        # Movies need every one of the listed names, in every filter
+        response = self.client.get(self.url, {'genre': 'Action,Drama', 'actor': 'Kim Basinger'})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [second_movie.id]
+        )
+
+        response = self.client.get(self.url, {'writer': 'Bob Kane', 'director': 'Tim Burton'})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [first_movie.id]
+        )
+
+        # Names are matched exactly, unlike substrings of the comma joined fields
+        response = self.client.get(self.url, {'actor': 'Keaton'})
+
+        self.assertEqual(response.json(), [])
+
+    def test_facets(self):
+        create_batman_movie()
+        second_movie = create_batman_movie()
+        models.MovieTag.objects.filter(movie=second_movie, role=models.MovieTag.LANGUAGE).delete()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('api:movie-facets'))
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            response.json(),
+            {
+                'genre': [{'name': 'Action', 'count': 2}, {'name': 'Adventure', 'count': 2}],
+                'country': [{'name': 'UK', 'count': 2}, {'name': 'USA', 'count': 2}],
+                'language': [{'name': 'English', 'count': 1}, {'name': 'French', 'count': 1},
+                             {'name': 'Spanish', 'count': 1}],
+            }
+        )
+
+        # Counts cover the filtered movies only
+        response = self.client.get(reverse('api:movie-facets'), {'language': 'English'})
+
+        self.assertEqual(
+            response.json()['genre'],
+            [{'name': 'Action', 'count': 1}, {'name': 'Adventure', 'count': 1}]
+        )
+
+    def test_list_numeric_ranges(self):
+        movies = [create_batman_movie() for _ in range(3)]
+        models.Movie.objects.filter(pk=movies[0].pk).update(runtime_minutes=90, box_office_usd=1000000, imdb_rating='6.5')
+        models.Movie.objects.filter(pk=movies[1].pk).update(runtime_minutes=None, box_office_usd=None)
+
+        response = self.client.get(self.url, {'runtime_min': 100, 'runtime_max': 130})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[2].id]
+        )
+
+        response = self.client.get(self.url, {'box_office_min': 500000})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[0].id]
+        )
+
+        response = self.client.get(self.url, {'imdb_rating_max': '7'})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[0].id]
+        )
+
+    def test_list_ordering_paginated(self):
+        movies = [create_batman_movie() for _ in range(5)]
+        for movie, runtime, rating in zip(movies, [120, None, 90, None, 120], ['7.6', '8.1', '6.5', '7.6', '9.0']):
+            models.Movie.objects.filter(pk=movie.pk).update(runtime_minutes=runtime, imdb_rating=rating)
+
+        response = self.client.get(self.url, {'ordering': '-imdb_rating', 'page_size': 2})
+
+        self.assertEqual(
+            [(movie['id'], movie['imdb_rating']) for movie in response.json()],
+            [(movies[4].id, '9.0'), (movies[1].id, '8.1')]
+        )
+
+        response = self.client.get(get_links(response)['next'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[3].id, movies[0].id]
+        )
+
+        # Movies without a runtime come last, also when walking the pages back
+        expected = [movies[2].id, movies[0].id, movies[4].id, movies[1].id, movies[3].id]
+
+        ids = []
+        links = {'next': self.url + '?ordering=runtime&page_size=2'}
+        while 'next' in links:
+            response = self.client.get(links['next'])
+            ids.append([movie['id'] for movie in response.json()])
+            links = get_links(response)
+
+        self.assertEqual(ids, [expected[0:2], expected[2:4], expected[4:]])
+
+        response = self.client.get(links['prev'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            expected[2:4]
+        )
+
+        # The primary key breaks ties in the direction of the ordering
+        response = self.client.get(self.url, {'ordering': '-runtime', 'page_size': 3})
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[3].id, movies[1].id, movies[4].id]
+        )
+
+        response = self.client.get(get_links(response)['next'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[0].id, movies[2].id]
+        )
+
+        response = self.client.get(get_links(response)['prev'])
+
+        self.assertEqual(
+            [movie['id'] for movie in response.json()],
+            [movies[3].id, movies[1].id, movies[4].id]
+        )
+
+    def test_create_first(self):
+        data = {'title': 'batman'}
+
+        # Lookup of an already saved movie, then the movie, its ratings and tags saved atomically
+        with self.assertNumQueries(9):
+            with requests_mock.mock() as m:
+                m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
+
+                response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            remove_ids(response.json()),
+            BATMAN_API_JSON_RESPONSE
+        )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            remove_ids(response.json()),
+            [BATMAN_API_JSON_RESPONSE]
+        )
+
+    def test_create_another(self):
+        create_batman_movie()
+
+        data = {'title': 'the other batman'}
+
+        with self.assertNumQueries(9):
+            with requests_mock.mock() as m:
+                m.get('http://www.omdbapi.com/', json=dict(BATMAN_OMDB_JSON_RESPONSE, imdbID='tt0000001'))
+
+                response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            remove_ids(response.json()),
+            dict(BATMAN_API_JSON_RESPONSE, imdb_id='tt0000001')
+        )
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            remove_ids(response.json()),
+            [BATMAN_API_JSON_RESPONSE, dict(BATMAN_API_JSON_RESPONSE, imdb_id='tt0000001')]
+        )
+
+    def test_create_existing(self):
+        movie = create_batman_movie()
+
+        data = {'title': 'Batman'}
+
+        # Lookup of the saved movie and its ratings, nothing is written
+        with self.assertNumQueries(2):
+            with requests_mock.mock() as m:
+                m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
+
+                response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            response.json(),
+            dict(BATMAN_API_JSON_RESPONSE, id=movie.id)
+        )
+        self.assertEqual(models.Movie.objects.count(), 1)
+
+    def test_create_shares_flight(self):
+        with patch.object(views.MovieViewset.create_flight, 'do', return_value=((create_batman_movie(), True), True)) as do:
+            response = self.client.post(self.url, {'title': ' BATMAN '}, format='json')
+
+        self.assertEqual(do.call_args[0][0], 'batman')
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_create_no_input(self):
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            response.json(),
+            {
+                'title': ['This field is required.']
+            }
+        )
+
+    def test_create_not_existing(self):
+        data = {'title': 'NotExistingMovieTitle'}
+
+        with self.assertNumQueries(0):
+            with requests_mock.mock() as m:
+                m.get('http://www.omdbapi.com/', json={'Response': 'False'})
+
+                response = self.client.post(self.url, data, format='json')
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            response.content,
+            b''
+        )
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_200_OK
+        )
+        self.assertEqual(
+            response.json(),
+            []
+        )
+
+
+def mock_async_omdb(*responses):
+    sent = []
+    responses = list(responses)
+
+    def handler(request):
+        sent.append(request)
+        status_code, data = responses.pop(0) if len(responses) > 1 else responses[0]
+        return httpx.Response(status_code, json=data)
+
+    client = patch.object(
+        AsyncOMDB, '_create_client',
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    return client, sent
+
+
+class AsyncOMDBClientTests(unittest.TestCase):
+    def setUp(self):
+        clear_omdb_cache()
+
+    def test_get_movie_successfully(self):
+        client, sent = mock_async_omdb((200, BATMAN_OMDB_JSON_RESPONSE))
+
+        with client:
+            data = async_to_sync(AsyncOMDB.get_movie_by_title)('batman')
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(sent[0].url.params['t'], 'batman')
+        self.assertEqual(data, OMDB._parse_response('batman', BATMAN_OMDB_JSON_RESPONSE))
+
+    @override_settings(OMDB_RETRY_BACKOFF=0)
+    def test_get_movie_retried(self):
+        client, sent = mock_async_omdb((503, {}), (200, BATMAN_OMDB_JSON_RESPONSE))
+
+        with client:
+            data = async_to_sync(AsyncOMDB.get_movie_by_title)('batman')
+
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(data['title'], 'Batman')
+
+    def test_get_movie_which_can_not_be_found(self):
+        client, sent = mock_async_omdb((200, {'Response': 'False'}))
+
+        with client:
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    async_to_sync(AsyncOMDB.get_movie_by_title)('movie title that for sure will not be found')
+
+        self.assertEqual(len(sent), 1)
+
+
+class AsyncMovieCreateTests(APITestCase):
+    maxDiff = None
+    url = reverse('api:movie-list')
+
+    def setUp(self):
+        clear_omdb_cache()
+
+    def post(self, data):
+        request = APIRequestFactory().post(self.url, data, format='json')
+        return async_to_sync(async_views.movie_list_create)(request)
+
+    def test_create(self):
+        client, sent = mock_async_omdb((200, BATMAN_OMDB_JSON_RESPONSE))
+
+        with client:
+            response = self.post({'title': 'batman'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            remove_ids(json.loads(response.content)),
+            BATMAN_API_JSON_RESPONSE
+        )
+        self.assertEqual(models.Movie.objects.count(), 1)
+
+    def test_create_no_input(self):
+        response = self.post({})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertEqual(
+            json.loads(response.content),
+            {
+                'title': ['This field is required.']
+            }
+        )
+
+    def test_create_not_existing(self):
+        client, sent = mock_async_omdb((200, {'Response': 'False'}))
+
+        with client:
+            response = self.post({'title': 'NotExistingMovieTitle'})
+
+        self.assertEqual(
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
+        )
+        self.assertFalse(models.Movie.objects.exists())
 
-        with self.assertNumQueries(5):
-            with requests_mock.mock() as m:
-                m.get('http://www.omdbapi.com/', json=BATMAN_OMDB_JSON_RESPONSE)
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    def test_create_through_asgi(self):
+        client, sent = mock_async_omdb((200, BATMAN_OMDB_JSON_RESPONSE))
 
-                response = self.client.post(self.url, data, format='json')
+        with client:
+            response = async_to_sync(self.async_client.post)(
+                self.url, {'title': 'batman'}, content_type='application/json'
+            )
 
         self.assertEqual(
             response.status_code,
@@ -357,68 +1751,207 @@ class MovieListCreateTests(APITestCase):
             BATMAN_API_JSON_RESPONSE
         )
 
-        with self.assertNumQueries(2):
-            response = self.client.get(self.url)
+    def test_create_cancelled(self):
+        with patch.object(async_views._create_flight, 'do', side_effect=asyncio.CancelledError):
+            with self.assertRaises(asyncio.CancelledError):
+                self.post({'title': 'batman'})
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    def test_create_malformed_input(self):
+        response = async_to_sync(self.async_client.post)(self.url, '{"title": ', content_type='application/json')
 
         self.assertEqual(
             response.status_code,
-            status.HTTP_200_OK
-        )
-        self.assertEqual(
-            remove_ids(response.json()),
-            [BATMAN_API_JSON_RESPONSE, BATMAN_API_JSON_RESPONSE]
+            status.HTTP_400_BAD_REQUEST
         )
+        self.assertIn('JSON parse error', response.json()['detail'])
 
-    def test_create_no_input(self):
-        with self.assertNumQueries(0):
-            response = self.client.post(self.url)
+        response = async_to_sync(self.async_client.post)(self.url, 'title=batman', content_type='text/plain')
 
         self.assertEqual(
             response.status_code,
-            status.HTTP_400_BAD_REQUEST
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
         )
+
+    @override_settings(REST_FRAMEWORK=dict(
+        settings.REST_FRAMEWORK, DEFAULT_RENDERER_CLASSES=('moviesproject.renderers.ORJSONRenderer',)
+    ))
+    def test_create_configured_renderer(self):
+        with patch.object(ORJSONRenderer, 'render', autospec=True, side_effect=ORJSONRenderer.render) as render:
+            response = self.post({})
+
+        self.assertEqual(render.call_count, 1)
         self.assertEqual(
-            response.json(),
+            json.loads(response.content),
             {
                 'title': ['This field is required.']
             }
         )
 
-    def test_create_not_existing(self):
-        data = {'title': 'NotExistingMovieTitle'}
+    def test_list(self):
+        create_batman_movie()
 
-        with self.assertNumQueries(0):
+        request = APIRequestFactory().get(self.url)
+        response = async_to_sync(async_views.movie_list_create)(request)
+        response.render()
+
+        self.assertEqual(
+            remove_ids(json.loads(response.content)),
+            [BATMAN_API_JSON_RESPONSE]
+        )
+
+
+    @override_settings(ROOT_URLCONF=AsyncURLConf)
+    def test_export_through_asgi(self):
+        movies = [create_batman_movie() for _ in range(3)]
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'scheme': 'http',
+            'method': 'GET', 'path': self.url, 'raw_path': self.url.encode('ascii'), 'root_path': '',
+            'query_string': b'format=ndjson', 'headers': [(b'host', b'testserver')],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+        }
+        messages = []
+
+        async def receive():
+            if not messages:
+                messages.append({'type': 'http.request'})
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            # The client stays connected until the whole response is sent
+            await asyncio.Future()
+
+        async def send(message):
+            messages.append(message)
+
+        # Closing the connection at the end of the request would end the transaction of the test
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        try:
+            with warnings.catch_warnings(record=True) as caught, \
+                    patch.object(views.MovieViewset, 'export_chunk_size', 1):
+                warnings.simplefilter('always')
+                async_to_sync(ASGIHandler())(scope, receive, send)
+        finally:
+            request_started.connect(close_old_connections)
+            request_finished.connect(close_old_connections)
+
+        self.assertEqual([str(warning.message) for warning in caught], [])
+        self.assertEqual(messages[1]['status'], status.HTTP_200_OK)
+
+        # One message per chunk, the content is not joined in a single body
+        bodies = [message['body'] for message in messages[2:] if message.get('body')]
+        self.assertEqual(len(bodies), 3)
+        self.assertEqual(
+            remove_ids([json.loads(line) for line in b''.join(bodies).splitlines()]),
+            [batman_api_response(movie) for movie in movies]
+        )
+
+class MovieListSerializerTests(APITestCase):
+    def get_serializer(self, ratings_count):
+        data = BATMAN_API_JSON_RESPONSE.copy()
+        data['imdb_id'] = 'tt{:07d}'.format(ratings_count)
+        data['ratings'] = [
+            {'source': 'Source {}'.format(i), 'value': '{}/10'.format(i)}
+            for i in range(ratings_count)
+        ]
+
+        serializer = serializers.MovieListSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        return serializer
+
+    def test_create_constant_queries(self):
+        for ratings_count in (1, 3, 10):
+            serializer = self.get_serializer(ratings_count)
+
+            # Savepoint, movie insert, ratings insert, tags insert and lookup, tag links insert, savepoint release
+            with self.assertNumQueries(7):
+                movie = serializer.save()
+
+            self.assertEqual(movie.ratings.count(), ratings_count)
+
+    def test_create_is_atomic(self):
+        serializer = self.get_serializer(3)
+
+        with patch.object(models.Rating.objects, 'bulk_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                serializer.save()
+
+        self.assertFalse(models.Movie.objects.exists())
+
+
+class MovieBulkCreateTests(APITestCase):
+    maxDiff = None
+    url = reverse('api:movie-bulk-create')
+
+    def setUp(self):
+        clear_omdb_cache()
+
+    def mock_omdb(self, m):
+        m.get('http://www.omdbapi.com/', json={'Response': 'False'})
+        m.get('http://www.omdbapi.com/?t=batman', json=BATMAN_OMDB_JSON_RESPONSE)
+
+    def test_create(self):
+        data = {'titles': ['batman', 'NotExistingMovieTitle', 'Batman']}
+
+        # Lookup of already saved movies, then the new ones saved atomically with their ratings and tags
+        with self.assertNumQueries(8):
             with requests_mock.mock() as m:
-                m.get('http://www.omdbapi.com/', json={'Response': 'False'})
+                self.mock_omdb(m)
 
                 response = self.client.post(self.url, data, format='json')
 
         self.assertEqual(
             response.status_code,
-            status.HTTP_400_BAD_REQUEST
+            status.HTTP_200_OK
         )
+
+        movie_ids = list(models.Movie.objects.values_list('id', flat=True))
         self.assertEqual(
-            response.content,
-            b''
+            response.json(),
+            [
+                {'title': 'batman', 'status': 'created', 'id': movie_ids[0]},
+                {'title': 'NotExistingMovieTitle', 'status': 'failed', 'error': 'movie not found'},
+                {'title': 'Batman', 'status': 'exists', 'id': movie_ids[0]},
+            ]
         )
 
-        with self.assertNumQueries(1):
-            response = self.client.get(self.url)
+        response = self.client.get(reverse('api:movie-list'))
 
         self.assertEqual(
-            response.status_code,
-            status.HTTP_200_OK
+            remove_ids(response.json()),
+            [BATMAN_API_JSON_RESPONSE]
         )
+
+    def test_create_no_titles(self):
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url, {'titles': []}, format='json')
+
         self.assertEqual(
-            response.json(),
-            []
+            response.status_code,
+            status.HTTP_400_BAD_REQUEST
         )
 
+    def test_import_command(self):
+        out = StringIO()
+
+        with requests_mock.mock() as m:
+            self.mock_omdb(m)
+
+            call_command('import_movies', 'batman', 'NotExistingMovieTitle', batch_size=1, stdout=out)
+
+        self.assertEqual(models.Movie.objects.count(), 1)
+        self.assertEqual(models.Rating.objects.count(), 3)
+        self.assertIn('Imported 1 of 2 movies', out.getvalue())
+
 
 class CommentListCreateTests(APITestCase):
     url = reverse('api:comment-list')
     maxDiff = None
 
+    def setUp(self):
+        clear_omdb_cache()
+
     def create_batman_movie(self):
         movie_url = reverse('api:movie-list')
         data = {'title': 'batman'}
@@ -443,7 +1976,7 @@ class CommentListCreateTests(APITestCase):
         )
 
     def test_list_empty(self):
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url)
 
         self.assertEqual(
@@ -460,7 +1993,7 @@ class CommentListCreateTests(APITestCase):
 
         comment = create_comment(movie, 'First comment!')
 
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url)
 
         self.assertEqual(
@@ -486,7 +2019,7 @@ class CommentListCreateTests(APITestCase):
         second_comment = create_comment(first_movie, 'Second comment.')
         third_comment = create_comment(second_movie, 'Third comment but to second movie')
 
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url)
 
         self.assertEqual(
@@ -514,6 +2047,40 @@ class CommentListCreateTests(APITestCase):
             ]
         )
 
+    def test_list_search(self):
+        movie = create_batman_movie()
+
+        create_comment(movie, 'What a great movie')
+        create_comment(movie, 'Boring')
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'search': 'great'})
+
+        self.assertEqual(
+            [comment['content'] for comment in response.json()],
+            ['What a great movie']
+        )
+
+    def test_list_search_paginated(self):
+        movie = create_batman_movie()
+
+        # Ranks differ with the number of matches on PostgreSQL, the cursor seeks on them
+        for count in (1, 3, 2, 5, 1, 4):
+            create_comment(movie, ' '.join(['great'] * count) + ' movie {}'.format(count))
+
+        expected = [comment['content'] for comment in self.client.get(self.url, {'search': 'great'}).json()]
+
+        contents = []
+        response = self.client.get(self.url, {'search': 'great', 'page_size': 1})
+        while True:
+            contents += [comment['content'] for comment in response.json()]
+            if 'next' not in get_links(response):
+                break
+            response = self.client.get(get_links(response)['next'])
+
+        self.assertEqual(len(expected), 6)
+        self.assertEqual(contents, expected)
+
     def test_list_filtered_by_movie(self):
         first_movie = create_batman_movie()
         second_movie = create_batman_movie()
@@ -522,7 +2089,7 @@ class CommentListCreateTests(APITestCase):
         second_comment = create_comment(first_movie, 'Second comment.')
         third_comment = create_comment(second_movie, 'Third comment but to second movie')
 
-        with self.assertNumQueries(3):
+        with self.assertNumQueries(4):
             response = self.client.get(self.url, {'movie': first_movie.id})
 
         self.assertEqual(
@@ -545,7 +2112,7 @@ class CommentListCreateTests(APITestCase):
             ]
         )
 
-        with self.assertNumQueries(3):
+        with self.assertNumQueries(4):
             response = self.client.get(self.url, {'movie': second_movie.id})
 
         self.assertEqual(
@@ -563,6 +2130,34 @@ class CommentListCreateTests(APITestCase):
             ]
         )
 
+    def test_list_paginated(self):
+        first_movie = create_batman_movie()
+        second_movie = create_batman_movie()
+
+        created_at = timezone.now()
+        with patch_server_time(created_at):
+            first_comment = create_comment(second_movie, 'First comment!')
+            second_comment = create_comment(first_movie, 'Second comment.')
+            third_comment = create_comment(first_movie, 'Third comment.')
+        fourth_comment = create_comment(first_movie, 'Fourth comment.')
+
+        pages = []
+        params = {'page_size': 2}
+        url = self.url
+        while url:
+            with self.assertNumQueries(2):
+                response = self.client.get(url, params)
+            pages.append([comment['content'] for comment in response.json()])
+            url, params = get_links(response).get('next'), None
+
+        self.assertEqual(
+            pages,
+            [
+                [second_comment.content, third_comment.content],
+                [fourth_comment.content, first_comment.content],
+            ]
+        )
+
     def test_create_first(self):
         movie = create_batman_movie()
 
@@ -571,7 +2166,8 @@ class CommentListCreateTests(APITestCase):
             'content': 'First comment!!!'
         }
 
-        with self.assertNumQueries(2):
+        # Movie lookup, then the comment, the movie counters and the hourly count are written atomically
+        with self.assertNumQueries(6):
             with patch_server_time() as patched_time:
                 response = self.client.post(self.url, input_data, format='json')
 
@@ -588,6 +2184,19 @@ class CommentListCreateTests(APITestCase):
             }
         )
 
+    def test_create_updates_movie_counters(self):
+        movie = create_batman_movie()
+
+        for hour in (13, 12):
+            with patch_server_time(datetime.datetime(2019, 7, 1, hour, tzinfo=datetime.timezone.utc)):
+                self.client.post(self.url, {'movie': movie.id, 'content': 'Comment'}, format='json')
+
+        movie.refresh_from_db()
+
+        self.assertEqual(movie.comments_count, 2)
+        # The newest comment wins, also when comments are saved out of order
+        self.assertEqual(movie.last_comment_at, datetime.datetime(2019, 7, 1, 13, tzinfo=datetime.timezone.utc))
+
     def test_create_another(self):
         movie = create_batman_movie()
         first_comment = create_comment(movie, 'First already existing comment')
@@ -597,7 +2206,7 @@ class CommentListCreateTests(APITestCase):
             'content': 'Second comment.'
         }
 
-        with self.assertNumQueries(2):
+        with self.assertNumQueries(6):
             with patch_server_time() as patched_time:
                 response = self.client.post(self.url, input_data, format='json')
 
@@ -614,7 +2223,7 @@ class CommentListCreateTests(APITestCase):
             }
         )
 
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url)
 
         self.assertEqual(
@@ -678,6 +2287,9 @@ class TopMovieTests(APITestCase):
     url = reverse('api:top-movies-list')
     maxDiff = None
 
+    def setUp(self):
+        clear_top_movies_cache()
+
     def test_put_is_not_allowed(self):
         response = self.client.put(self.url)
 
@@ -724,7 +2336,7 @@ class TopMovieTests(APITestCase):
             'comments_before': '2019-07-31'
         }
 
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url, params)
 
         self.assertEqual(
@@ -748,7 +2360,7 @@ class TopMovieTests(APITestCase):
             'comments_before': (first_time + datetime.timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S'),
         }
 
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url, params)
 
         self.assertEqual(
@@ -766,7 +2378,7 @@ class TopMovieTests(APITestCase):
         params['comments_after'] = (first_time + datetime.timedelta(seconds=1)).strftime('%Y-%m-%d %H:%M:%S'),
         params['comments_before'] = (first_time + datetime.timedelta(seconds=2)).strftime('%Y-%m-%d %H:%M:%S'),
 
-        with self.assertNumQueries(1):
+        with self.assertNumQueries(2):
             response = self.client.get(self.url, params)
 
         self.assertEqual(
@@ -780,3 +2392,338 @@ class TopMovieTests(APITestCase):
                 {'movie_id': second_movie.id, 'rank': 1, 'total_comments': 0}
             ]
         )
+
+    def test_list_many_hours(self):
+        first_movie = create_batman_movie()
+        second_movie = create_batman_movie()
+
+        start = datetime.datetime(2019, 7, 1, 10, 30, tzinfo=datetime.timezone.utc)
+        for minutes, movie in ((0, first_movie), (60, first_movie), (65, second_movie), (120, second_movie),
+                               (150, second_movie), (180, first_movie), (240, first_movie)):
+            with patch_server_time(start + datetime.timedelta(minutes=minutes)):
+                create_comment(movie, 'Comment')
+
+        self.assertEqual(
+            list(models.CommentCount.objects.values_list('movie', 'bucket', 'count')),
+            [
+                (first_movie.id, datetime.datetime(2019, 7, 1, 10, tzinfo=datetime.timezone.utc), 1),
+                (first_movie.id, datetime.datetime(2019, 7, 1, 11, tzinfo=datetime.timezone.utc), 1),
+                (first_movie.id, datetime.datetime(2019, 7, 1, 13, tzinfo=datetime.timezone.utc), 1),
+                (first_movie.id, datetime.datetime(2019, 7, 1, 14, tzinfo=datetime.timezone.utc), 1),
+                (second_movie.id, datetime.datetime(2019, 7, 1, 11, tzinfo=datetime.timezone.utc), 1),
+                (second_movie.id, datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc), 1),
+                (second_movie.id, datetime.datetime(2019, 7, 1, 13, tzinfo=datetime.timezone.utc), 1),
+            ]
+        )
+
+        # Partial hours at both edges, 11:00-13:00 taken from the rollup
+        params = {
+            'comments_after': (start + datetime.timedelta(minutes=15)).isoformat(),
+            'comments_before': (start + datetime.timedelta(minutes=200)).isoformat(),
+        }
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(
+            response.json(),
+            [
+                {'movie_id': first_movie.id, 'rank': 2, 'total_comments': 2},
+                {'movie_id': second_movie.id, 'rank': 1, 'total_comments': 3}
+            ]
+        )
+
+    def test_list_cached(self):
+        movie = create_batman_movie()
+        create_comment(movie, 'First comment!')
+
+        params = {
+            'comments_after': '2019-06-30',
+            'comments_before': '2019-07-31'
+        }
+
+        response = self.client.get(self.url, params)
+        self.assertEqual(response['X-Cache'], 'MISS')
+
+        # Only the list version is checked, the ranking itself comes from the cache
+        with self.assertNumQueries(1):
+            cached_response = self.client.get(self.url, params)
+
+        self.assertEqual(cached_response['X-Cache'], 'HIT')
+        self.assertEqual(cached_response.json(), response.json())
+        self.assertEqual(TopMoviesCache.stats(), {'hits': 1, 'misses': 1})
+
+        output = StringIO()
+        call_command('top_movies_cache_stats', stdout=output)
+        self.assertEqual(output.getvalue(), 'hits: 1, misses: 1\nhit ratio: 50.0%\n')
+
+    def test_list_cache_key_normalized(self):
+        first_movie = create_batman_movie()
+        second_movie = create_batman_movie()
+
+        params = {
+            'comments_after': '2019-06-30T00:00:00Z',
+            'comments_before': '2019-07-31T00:00:00Z',
+            'movie_id': '{},{}'.format(second_movie.id, first_movie.id),
+        }
+        self.client.get(self.url, params)
+
+        params = {
+            'comments_after': '2019-06-30T02:00:00+02:00',
+            'comments_before': '2019-07-31T00:00:00Z',
+            'movie_id': '{},{}'.format(first_movie.id, second_movie.id),
+        }
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_comment_invalidates_matching_window(self):
+        movie = create_batman_movie()
+
+        start = datetime.datetime(2019, 7, 1, 10, tzinfo=datetime.timezone.utc)
+        inside = {
+            'comments_after': start.isoformat(),
+            'comments_before': (start + datetime.timedelta(hours=1)).isoformat(),
+        }
+        outside = {
+            'comments_after': (start + datetime.timedelta(hours=1)).isoformat(),
+            'comments_before': (start + datetime.timedelta(hours=2)).isoformat(),
+        }
+
+        self.client.get(self.url, inside)
+        self.client.get(self.url, outside)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with patch_server_time(start + datetime.timedelta(minutes=30)):
+                create_comment(movie, 'Comment')
+
+        response = self.client.get(self.url, inside)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            response.json(),
+            [{'movie_id': movie.id, 'rank': 1, 'total_comments': 1}]
+        )
+
+        response = self.client.get(self.url, outside)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_comment_invalidates_long_window(self):
+        movie = create_batman_movie()
+
+        # Partial days at both edges around whole months
+        window = {
+            'comments_after': '2019-05-30T10:30:00Z',
+            'comments_before': '2019-08-02T05:00:00Z',
+        }
+        later = {
+            'comments_after': '2019-08-02T05:00:00Z',
+            'comments_before': '2019-09-01T00:00:00Z',
+        }
+
+        self.client.get(self.url, window)
+        self.client.get(self.url, later)
+
+        for created_at in (datetime.datetime(2019, 5, 30, 10, 45, tzinfo=datetime.timezone.utc),
+                           datetime.datetime(2019, 6, 15, tzinfo=datetime.timezone.utc),
+                           datetime.datetime(2019, 8, 2, 4, 59, tzinfo=datetime.timezone.utc)):
+            with self.captureOnCommitCallbacks(execute=True):
+                with patch_server_time(created_at):
+                    create_comment(movie, 'Comment')
+
+            response = self.client.get(self.url, window)
+            self.assertEqual(response['X-Cache'], 'MISS')
+
+        self.assertEqual(response.json(), [{'movie_id': movie.id, 'rank': 1, 'total_comments': 3}])
+        self.assertEqual(self.client.get(self.url, later)['X-Cache'], 'HIT')
+
+    def test_comment_invalidates_years_window(self):
+        movie = create_batman_movie()
+
+        window = {
+            'comments_after': '2010-01-01T00:00:00Z',
+            'comments_before': '2020-01-01T00:00:00Z',
+        }
+        self.client.get(self.url, window)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with patch_server_time(datetime.datetime(2015, 3, 15, 12, tzinfo=datetime.timezone.utc)):
+                create_comment(movie, 'Comment')
+
+        response = self.client.get(self.url, window)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.json(), [{'movie_id': movie.id, 'rank': 1, 'total_comments': 1}])
+
+    def test_wide_window_not_cached(self):
+        create_batman_movie()
+
+        params = {
+            'comments_after': '0001-01-01T00:00:00Z',
+            'comments_before': '9999-12-31T23:30:00Z',
+        }
+
+        with patch.object(caches[settings.TOP_MOVIES_CACHE_ALIAS], 'get_many') as get_many:
+            response = self.client.get(self.url, params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['X-Cache'], 'BYPASS')
+        get_many.assert_not_called()
+
+        self.assertEqual(self.client.get(self.url, params)['X-Cache'], 'BYPASS')
+        self.assertEqual(TopMoviesCache.stats(), {'hits': 0, 'misses': 0})
+
+    def test_local_memory_cache_deploy_warning(self):
+        def cache_warnings(backend):
+            with self.settings(CACHES=dict(settings.CACHES, top_movies={'BACKEND': backend})):
+                return [
+                    message.id for message in checks.run_checks(include_deployment_checks=True)
+                    if message.id.startswith('moviesapp.')
+                ]
+
+        self.assertEqual(cache_warnings('django.core.cache.backends.locmem.LocMemCache'), ['moviesapp.W001'])
+        self.assertEqual(cache_warnings('django.core.cache.backends.db.DatabaseCache'), [])
+
+    def test_movie_create_invalidates_all(self):
+        movie = create_batman_movie()
+
+        params = {
+            'comments_after': '2019-06-30',
+            'comments_before': '2019-07-31'
+        }
+        self.client.get(self.url, params)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            serializers.create_movies([dict(BATMAN_API_JSON_RESPONSE, imdb_id='tt0103776')])
+
+        response = self.client.get(self.url, params)
+
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.json()), 2)
+        self.assertIn(movie.id, [row['movie_id'] for row in response.json()])
+
+
+class QueryCountGuardMixin(object):
+    """
+    Checks that endpoints issue the same queries whatever the number of rows.
+
+    `populate(size)` grows the dataset to `size`, then the request is made
+    and its SQL recorded, for every size in `dataset_sizes`.
+    """
+    dataset_sizes = (1, 4, 16)
+
+    def assertConstantQueries(self, populate, request, expected_status=status.HTTP_200_OK):
+        queries = {}
+        for size in self.dataset_sizes:
+            populate(size)
+
+            with CaptureQueriesContext(connection) as captured:
+                response = request()
+
+            self.assertEqual(response.status_code, expected_status, response.content)
+            queries[size] = [query['sql'] for query in captured.captured_queries]
+
+        counts = {size: len(sql) for size, sql in queries.items()}
+        if len(set(counts.values())) > 1:
+            self.fail('Query count grows with the dataset size {}:\n{}'.format(counts, '\n'.join(
+                '{} rows:\n    {}'.format(size, '\n    '.join(sql)) for size, sql in queries.items()
+            )))
+
+        return queries[self.dataset_sizes[0]]
+
+
+class QueryCountRegressionTests(QueryCountGuardMixin, APITestCase):
+    movies_url = reverse('api:movie-list')
+    comments_url = reverse('api:comment-list')
+    top_movies_url = reverse('api:top-movies-list')
+
+    top_movies_params = {
+        'comments_after': '2019-06-30',
+        'comments_before': '2019-07-31',
+    }
+
+    def setUp(self):
+        clear_omdb_cache()
+        clear_top_movies_cache()
+
+    def populate(self, size):
+        """
+        Grows the dataset to `size` movies with three ratings and three comments each.
+        """
+        with patch_server_time(datetime.datetime(2019, 7, 1, 12, tzinfo=datetime.timezone.utc)):
+            while models.Movie.objects.count() < size:
+                movie = create_batman_movie()
+                for i in range(3):
+                    create_comment(movie, 'Great comment {}'.format(i))
+
+        clear_top_movies_cache()
+
+    def first_movie_id(self):
+        self.populate(1)
+        return models.Movie.objects.order_by('id').values_list('id', flat=True).first()
+
+    def test_guard_detects_n_plus_one(self):
+        def request():
+            for movie in models.Movie.objects.all():
+                list(movie.ratings.all())
+            return self.client.get(self.movies_url)
+
+        with self.assertRaisesRegex(AssertionError, 'Query count grows with the dataset size'):
+            self.assertConstantQueries(self.populate, request)
+
+    def test_movies_list(self):
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.movies_url))
+
+    def test_movies_list_filtered(self):
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.movies_url, {'search': 'Batman'}))
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.movies_url, {'fields': 'id,title'}))
+
+    def test_movies_list_tagged(self):
+        self.assertConstantQueries(
+            self.populate,
+            lambda: self.client.get(self.movies_url, {'genre': 'Action,Adventure', 'actor': 'Michael Keaton'})
+        )
+
+    def test_movies_facets(self):
+        self.assertConstantQueries(self.populate, lambda: self.client.get(reverse('api:movie-facets')))
+
+    def test_movies_create(self):
+        titles = iter(range(len(self.dataset_sizes)))
+
+        def create():
+            title = 'Movie {}'.format(next(titles))
+            with requests_mock.mock() as m:
+                m.get('http://www.omdbapi.com/', json=dict(
+                    BATMAN_OMDB_JSON_RESPONSE, Title=title, imdbID='tt9{}'.format(title[-1])
+                ))
+                return self.client.post(self.movies_url, {'title': title}, format='json')
+
+        self.assertConstantQueries(self.populate, create, status.HTTP_201_CREATED)
+
+    def test_comments_list(self):
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.comments_url))
+
+    def test_comments_list_filtered(self):
+        movie_id = self.first_movie_id()
+
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.comments_url, {'movie': movie_id}))
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.comments_url, {'search': 'great'}))
+
+    def test_comments_create(self):
+        movie_id = self.first_movie_id()
+
+        self.assertConstantQueries(
+            self.populate,
+            lambda: self.client.post(self.comments_url, {'movie': movie_id, 'content': 'New'}),
+            status.HTTP_201_CREATED
+        )
+
+    def test_top_movies_list(self):
+        self.assertConstantQueries(self.populate, lambda: self.client.get(self.top_movies_url, self.top_movies_params))
+
+    def test_top_movies_list_filtered(self):
+        movie_id = self.first_movie_id()
+
+        self.assertConstantQueries(
+            self.populate,
+            lambda: self.client.get(self.top_movies_url, dict(self.top_movies_params, movie_id=movie_id))
+        )
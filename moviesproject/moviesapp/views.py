@@ -1,20 +1,69 @@
-from django.http import HttpResponseBadRequest
+from itertools import islice
+
+from django.db.models import Count, Subquery
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
 
 from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
+from moviesproject.mixins import ConditionalListModelMixin, ReplicaReadMixin, SparseFieldsetMixin
+from moviesproject.renderers import NDJSONRenderer
+from moviesproject.routers import is_pinned, use_replica
+from moviesproject.serializers import ValuesSerializer
+from moviesproject.singleflight import SingleFlight
+from moviesproject.timing import measure
 
 from . import models
 from . import serializers
 from . import filters
+from . import pagination
+from .cache import TopMoviesCache
+from .importer import import_movies
 from .omdb import OMDB
 
 
-class MovieViewset(mixins.ListModelMixin,
+# Movies and comments are only ever inserted through the API, so the id of the
+# newest row is enough to tell whether a list has changed, other changes bump a `ListVersion`
+
+
+def _latest_movie_and_comment():
+    latest_comments = models.Comment.objects.order_by('-id')
+
+    # All in a single query, there are no comments without movies anyway
+    return models.Movie.objects.order_by('-id').annotate(
+        comment_id=Subquery(latest_comments.values('id')[:1]),
+        comment_created_at=Subquery(latest_comments.values('created_at')[:1]),
+        movies_version=models.ListVersion.current(models.ListVersion.MOVIES),
+    ).values_list('id', 'comment_id', 'comment_created_at', 'movies_version').first() or (None, None, None, 0)
+
+
+def _latest_comment():
+    return models.Comment.objects.order_by('-id').annotate(
+        comments_version=models.ListVersion.current(models.ListVersion.COMMENTS),
+        comments_bumped_at=models.ListVersion.last_bumped(models.ListVersion.COMMENTS),
+    ).values_list('id', 'created_at', 'comments_version', 'comments_bumped_at').first() or (None, None, 0, None)
+
+
+class MovieViewset(ReplicaReadMixin,
+                   SparseFieldsetMixin,
+                   ConditionalListModelMixin,
                    mixins.CreateModelMixin,
                    viewsets.GenericViewSet):
 
-    queryset = models.Movie.objects.all().prefetch_related('ratings')
+    # The search vector is only ever used for filtering
+    queryset = models.Movie.objects.defer('search_vector').prefetch_related('ratings')
+    filterset_class = filters.MovieFilterSet
+    pagination_class = pagination.MoviePagination
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + [NDJSONRenderer]
+
+    export_chunk_size = 1000
+
+    facet_roles = (models.MovieTag.GENRE, models.MovieTag.COUNTRY, models.MovieTag.LANGUAGE)
+
+    # Concurrent creates of the same title share one OMDB request and one insert
+    create_flight = SingleFlight()
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -23,36 +72,191 @@ class MovieViewset(mixins.ListModelMixin,
         elif self.action == 'list':
             return serializers.MovieListSerializer
 
+        elif self.action == 'bulk_create':
+            return serializers.MovieBulkCreateSerializer
+
+        elif self.action == 'facets':
+            return serializers.FacetCountSerializer
+
         raise NotImplementedError('the viewset does not implement action {action!r}'.format(action=self.action))
 
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == NDJSONRenderer.format:
+            return self.export(request.accepted_renderer)
+
+        return super().list(request, *args, **kwargs)
+
+    def get_list_version(self):
+        # Comments change the counters of the listed movies, so does their reconciliation
+        movie_id, comment_id, created_at, version = _latest_movie_and_comment()
+        return '{}:{}:{}'.format(movie_id, comment_id, version), None
+
+    def get_values_serializer(self):
+        return ValuesSerializer(self.get_serializer(), models.Movie)
+
+    def get_values_queryset(self, queryset, values_serializer):
+        # Pagination seeks on the ordering keys, which may be annotations such as the search rank
+        ordering = [name.lstrip('-') for name in self.paginator.get_ordering(queryset)]
+        columns = ordering + values_serializer.columns + list(queryset.query.annotations)
+        return queryset.prefetch_related(None).values(*dict.fromkeys(columns))
+
+    def list_response(self, queryset):
+        # Lists are serialized straight from `values()` rows, which is several times
+        # faster than going through model instances and `MovieListSerializer`
+        values_serializer = self.get_values_serializer()
+        rows = self.get_values_queryset(queryset, values_serializer)
+
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            with measure('serialize'):
+                data = values_serializer.to_representation(page)
+            return self.get_paginated_response(data)
+
+        with measure('serialize'):
+            data = values_serializer.to_representation(rows)
+        return Response(data)
+
+    def export(self, renderer):
+        values_serializer = self.get_values_serializer()
+        rows = self.get_values_queryset(self.filter_queryset(self.get_queryset()), values_serializer)
+
+        return StreamingHttpResponse(
+            self._export_chunks(rows, values_serializer, renderer, self.replica),
+            content_type=renderer.media_type
+        )
+
+    def _export_chunks(self, rows, values_serializer, renderer, replica):
+        # Chunks are read after the view has returned, outside of its replica routing
+        rows = rows.using(replica or rows.db).iterator(chunk_size=self.export_chunk_size)
+
+        while True:
+            with use_replica(replica):
+                chunk = list(islice(rows, self.export_chunk_size))
+                if not chunk:
+                    break
+
+                data = values_serializer.to_representation(chunk)
+
+            yield renderer.render(data)
+
     def create(self, request, *args, **kwargs):
         write_serializer = serializers.MovieCreateSerializer(data=request.data)
         write_serializer.is_valid(raise_exception=True)
 
+        title = write_serializer.data['title']
+
         try:
-            full_data = OMDB.get_movie_by_title(write_serializer.data['title'])
+            (instance, created), shared = self.create_flight.do(OMDB._normalize_title(title), self._create_movie, title)
         except:
             return HttpResponseBadRequest()
 
+        with measure('serialize'):
+            data = serializers.MovieListSerializer(instance).data
+
+        response_status = status.HTTP_201_CREATED if created and not shared else status.HTTP_200_OK
+        return Response(data, status=response_status)
+
+    @staticmethod
+    def _create_movie(title):
+        full_data = OMDB.get_movie_by_title(title)
+
         read_serializer = serializers.MovieListSerializer(data=full_data)
         read_serializer.is_valid(raise_exception=True)
-        instance = read_serializer.save()
 
-        return Response(serializers.MovieListSerializer(instance).data, status=status.HTTP_201_CREATED)
+        (instance, created), = serializers.get_or_create_movies([read_serializer.validated_data])
+        return instance, created
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = serializers.MovieBulkCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        report = list(import_movies(serializer.validated_data['titles']))
+
+        return Response(report, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request, *args, **kwargs):
+        """
+        Numbers of the filtered movies per genre, country and language, most common first.
+        """
+        movies = self.filter_queryset(self.get_queryset()).order_by().values('id')
+
+        # All roles counted in a single grouped query
+        counts = (
+            models.MovieTag.objects
+            .filter(role__in=self.facet_roles, movie__in=movies)
+            .values('role', 'tag__name')
+            .annotate(count=Count('movie'))
+            .order_by('role', '-count', 'tag__name')
+        )
 
+        facets = {role: [] for role in self.facet_roles}
+        for row in counts:
+            facets[row['role']].append(row)
 
-class CommentViewset(mixins.ListModelMixin,
-                         mixins.CreateModelMixin,
+        with measure('serialize'):
+            data = {
+                role: self.get_serializer(rows, many=True).data
+                for role, rows in facets.items()
+            }
+
+        return Response(data)
+
+
+class CommentViewset(ReplicaReadMixin,
+                     ConditionalListModelMixin,
+                     mixins.CreateModelMixin,
                      viewsets.GenericViewSet):
 
-    queryset = models.Comment.objects.all()
+    queryset = models.Comment.objects.defer('search_vector')
     serializer_class = serializers.CommentSerializer
     filterset_class = filters.CommentFilterSet
+    pagination_class = pagination.CommentPagination
 
+    def get_list_version(self):
+        # Detached partitions remove comments, see `moviesapp.partitions`
+        comment_id, created_at, version, bumped_at = _latest_comment()
+        return '{}:{}'.format(comment_id, version), max(filter(None, (created_at, bumped_at)), default=None)
 
-class TopMovieViewset(mixins.ListModelMixin,
+
+class TopMovieViewset(ReplicaReadMixin,
+                      ConditionalListModelMixin,
                       viewsets.GenericViewSet):
 
     queryset = models.Movie.objects
     serializer_class = serializers.TopMovieSerializer
     filterset_class = filters.TopMovieFilterSet
+
+    def list_response(self, queryset):
+        # The queryset has already been filtered, this only reads back the cleaned parameters
+        filterset = self.filterset_class(self.request.query_params, queryset=queryset, request=self.request)
+        filterset.form.is_valid()
+        params = [filterset.form.cleaned_data[name] for name in ('comments_after', 'comments_before', 'movie_id')]
+
+        # Read before the ranking is computed, a comment committed meanwhile bumps past this key
+        key = TopMoviesCache.key(*params)
+
+        # Windows too wide to be cached, and clients pinned to the primary, who are
+        # after their own writes which the cache may not reflect yet
+        if key is None or is_pinned(self.request):
+            data = None
+            cache_status = 'BYPASS'
+        else:
+            data = TopMoviesCache.get(key)
+            cache_status = 'HIT' if data is not None else 'MISS'
+
+        if data is None:
+            with measure('serialize'):
+                data = list(self.get_serializer(queryset, many=True).data)
+
+            # A lagging replica may not have the comments whose invalidation already happened
+            if key is not None and self.replica is None:
+                TopMoviesCache.set(key, data)
+
+        return Response(data, headers={'X-Cache': cache_status})
+
+    def get_list_version(self):
+        # New movies join the rankings too and have no creation time, so there is no `Last-Modified`
+        movie_id, comment_id, created_at, version = _latest_movie_and_comment()
+        return '{}:{}'.format(movie_id, comment_id), None
@@ -0,0 +1,17 @@
+"""
+ASGI config for moviesproject project.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'moviesproject.settings')
+os.environ.setdefault('MOVIES_ASYNC_CREATE', '1')
+
+application = get_asgi_application()
@@ -1,5 +1,10 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import DecimalField, F, Q, Value
+from django.db.models.functions import Cast
 
+from django_filters.constants import EMPTY_VALUES
 from django_filters.rest_framework import FilterSet as DjangoFilterSet
 
 from django_filters.filters import __all__ as filters_all
@@ -10,6 +15,7 @@ __all__ = filters_all
 __all__ += [
     'FilterSet',
     'NumberInFilter',
+    'SearchFilter',
 ]
 
 
@@ -36,3 +42,42 @@ class FilterSet(DjangoFilterSet):
 
 class NumberInFilter(BaseInFilter, NumberFilter):
     pass
+
+
+class SearchFilter(CharFilter):
+    """
+    Full-text search on a stored `SearchVectorField`, best matches first.
+
+    The rank of every match is annotated as `rank_annotation`. Backends other
+    than PostgreSQL fall back to `icontains` over `fields`, with equal ranks.
+
+    Ranks are rounded to an exact decimal, keyset pagination seeks on them and
+    a `real` rank does not survive the round trip through the cursor.
+    """
+    rank_annotation = 'search_rank'
+    rank_output_field = DecimalField(max_digits=20, decimal_places=10)
+
+    def __init__(self, *args, fields=(), config='english', **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields = fields
+        self.config = config
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+
+        if connections[qs.db].vendor == 'postgresql':
+            query = SearchQuery(value, config=self.config)
+            qs = qs.filter(**{self.field_name: query}).annotate(**{
+                self.rank_annotation: Cast(SearchRank(F(self.field_name), query), self.rank_output_field),
+            })
+        else:
+            condition = Q()
+            for name in self.fields:
+                condition |= Q(**{'{}__icontains'.format(name): value})
+
+            qs = qs.filter(condition).annotate(**{
+                self.rank_annotation: Cast(Value(0), self.rank_output_field),
+            })
+
+        return qs.order_by('-' + self.rank_annotation, 'pk')
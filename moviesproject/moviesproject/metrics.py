@@ -0,0 +1,104 @@
+import bisect
+import threading
+
+from django.http import HttpResponse
+
+
+# Metrics are kept in process memory, every worker process exposes its own
+REGISTRY = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+
+    pairs = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"'))
+        for name, value in labels
+    )
+    return '{' + ','.join(pairs) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram(object):
+    """
+    Prometheus histogram, observations are counted into cumulative buckets per label values.
+    """
+    DEFAULT_BUCKETS = (.001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+
+        self._lock = threading.Lock()
+        self._series = {}
+
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+
+            series['buckets'][index] += 1
+            series['sum'] += value
+
+    def collect(self):
+        yield '# HELP {} {}'.format(self.name, self.documentation)
+        yield '# TYPE {} histogram'.format(self.name)
+
+        with self._lock:
+            series = [(key, list(values['buckets']), values['sum']) for key, values in sorted(self._series.items())]
+
+        for key, buckets, total in series:
+            labels = list(zip(self.labelnames, key))
+
+            count = 0
+            for bound, bucket in zip(self.buckets + (float('inf'),), buckets):
+                count += bucket
+                le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                yield '{}_bucket{} {}'.format(self.name, _format_labels(labels + [('le', le)]), count)
+
+            yield '{}_sum{} {}'.format(self.name, _format_labels(labels), _format_value(total))
+            yield '{}_count{} {}'.format(self.name, _format_labels(labels), count)
+
+
+class Collector(object):
+    """
+    Metric whose samples are read from `collect_samples()`, returning (labels, value) pairs, when exposed.
+    """
+
+    def __init__(self, name, documentation, metric_type, collect_samples):
+        self.name = name
+        self.documentation = documentation
+        self.metric_type = metric_type
+        self.collect_samples = collect_samples
+
+        REGISTRY.append(self)
+
+    def collect(self):
+        yield '# HELP {} {}'.format(self.name, self.documentation)
+        yield '# TYPE {} {}'.format(self.name, self.metric_type)
+
+        for labels, value in self.collect_samples():
+            yield '{}{} {}'.format(self.name, _format_labels(sorted(labels.items())), _format_value(value))
+
+
+def render():
+    return ''.join(line + '\n' for metric in REGISTRY for line in metric.collect())
+
+
+def metrics_view(request):
+    """
+    Exposes all metrics in the Prometheus text format.
+    """
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,166 @@
+import hashlib
+import calendar
+import random
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from rest_framework import mixins, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .routers import is_pinned, pin_to_primary, use_replica
+from .timing import measure
+
+
+class ConditionalListModelMixin(mixins.ListModelMixin):
+    """
+    List a queryset, answering `304 Not Modified` when the client already has
+    the current representation, without querying and serializing the list.
+
+    Views implement `get_list_version()`, returning a cheap version of the
+    listed data together with its last modification time (or `None`).
+    """
+
+    def get_list_version(self):
+        raise NotImplementedError('`get_list_version()` must be implemented.')
+
+    def get_list_etag(self, request, version):
+        representation = '{}:{}:{}'.format(version, request.get_full_path(), request.accepted_media_type)
+        return quote_etag(hashlib.sha1(representation.encode('utf-8')).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        # Invalid filters are reported before anything else is queried
+        queryset = self.filter_queryset(self.get_queryset())
+
+        version, last_modified = self.get_list_version()
+        etag = self.get_list_etag(request, version)
+        timestamp = calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = self.list_response(queryset)
+
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+
+        return response
+
+    def list_response(self, queryset):
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            with measure('serialize'):
+                data = self.get_serializer(page, many=True).data
+            return self.get_paginated_response(data)
+
+        with measure('serialize'):
+            data = self.get_serializer(queryset, many=True).data
+        return Response(data)
+
+
+class SparseFieldsetMixin(object):
+    """
+    Let clients pick the serialized fields with `?fields=a,b` or leave some
+    out with `?exclude=a,b`. Only the columns and prefetches backing the
+    picked fields are loaded.
+
+    The serializer has to accept `fields` and `exclude` arguments, see
+    `moviesproject.serializers.SparseFieldsetSerializerMixin`.
+    """
+    fields_query_param = 'fields'
+    exclude_query_param = 'exclude'
+    sparse_fieldset_actions = ('list',)
+
+    def _parse_fieldset_param(self, param, available):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+
+        names = [name.strip() for name in value.split(',') if name.strip()]
+
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            raise ValidationError({param: ['Unknown fields: {}.'.format(', '.join(unknown))]})
+
+        return names
+
+    def get_sparse_fieldset(self):
+        """
+        Returns names of the picked serializer fields, `None` when all fields are to be serialized.
+        """
+        if self.action not in self.sparse_fieldset_actions:
+            return None
+
+        if not hasattr(self, '_sparse_fieldset'):
+            self._serializer_fields = self.get_serializer_class()().fields
+            available = list(self._serializer_fields)
+
+            fields = self._parse_fieldset_param(self.fields_query_param, available)
+            exclude = self._parse_fieldset_param(self.exclude_query_param, available) or ()
+
+            picked = [name for name in available if (fields is None or name in fields) and name not in exclude]
+            self._sparse_fieldset = None if picked == available else picked
+
+        return self._sparse_fieldset
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is None:
+            return queryset
+
+        sources = {self._serializer_fields[name].source.split('.')[0] for name in fieldset}
+
+        model = queryset.model
+        columns = [
+            field.name for field in model._meta.concrete_fields
+            if field.name in sources or field.attname in sources
+        ]
+        lookups = [
+            lookup for lookup in queryset._prefetch_related_lookups
+            if getattr(lookup, 'prefetch_through', lookup).split('__')[0] in sources
+        ]
+
+        return queryset.prefetch_related(None).prefetch_related(*lookups).only(model._meta.pk.name, *columns)
+
+    def get_serializer(self, *args, **kwargs):
+        fieldset = self.get_sparse_fieldset()
+        if fieldset is not None:
+            kwargs['fields'] = fieldset
+
+        return super().get_serializer(*args, **kwargs)
+
+
+class ReplicaReadMixin(object):
+    """
+    Serves `replica_actions` from a random one of `DATABASE_REPLICAS`.
+
+    Clients which have just written are pinned to the primary for
+    `DATABASE_REPLICA_PIN_SECONDS`, so that they read their own writes.
+    """
+    replica_actions = ('list',)
+
+    def get_replica(self, request):
+        action = self.action_map.get(request.method.lower())
+        if action not in self.replica_actions or not settings.DATABASE_REPLICAS or is_pinned(request):
+            return None
+
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def dispatch(self, request, *args, **kwargs):
+        self.replica = self.get_replica(request)
+
+        with use_replica(self.replica):
+            return super().dispatch(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        if request.method not in SAFE_METHODS and status.is_success(response.status_code):
+            pin_to_primary(response)
+
+        return response
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class PostgreSQLOnlyMixin(object):
+    """
+    Makes a migration operation touch the schema on PostgreSQL only while
+    still applying its state changes, so other backends (e.g. SQLite used
+    for local runs) skip features they do not support.
+    """
+
+    @staticmethod
+    def _is_postgresql(schema_editor):
+        return schema_editor.connection.vendor == 'postgresql'
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if self._is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if self._is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class PostgreSQLRunSQL(PostgreSQLOnlyMixin, migrations.RunSQL):
+    pass
@@ -0,0 +1,207 @@
+import datetime
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import F, Q
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination seeking on a composite key instead of using OFFSET.
+
+    `ordering` must list model attribute or annotation names, optionally
+    prefixed with `-`, which together are unique, so the cost of fetching
+    a page does not depend on how deep it is.
+    The response body stays a plain list, links to neighbouring pages are
+    sent in the `Link` header. Querysets may return model instances as well
+    as `values()` rows containing the `ordering` names.
+
+    NULLs of nullable keys sort as the largest values, like in PostgreSQL
+    indexes, so they come last in ascending and first in descending order.
+    """
+    ordering = ('id',)
+
+    # Follow an explicit `order_by()` of the queryset, e.g. by an ordering or search filter, instead of `ordering`
+    follow_queryset_ordering = False
+
+    cursor_query_param = 'cursor'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in self.get_ordering(queryset)]
+        self.fields = [self._get_field(queryset, name) for name, descending in self.keys]
+        self.annotations = set(queryset.query.annotations)
+
+        position, self.reverse = self.decode_cursor(request)
+
+        queryset = queryset.order_by(*[
+            self._order_by(name, field, larger=descending == self.reverse)
+            for (name, descending), field in zip(self.keys, self.fields)
+        ])
+        if position is not None:
+            queryset = queryset.filter(self._seek_filter(position))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if self.reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        return self.page
+
+    def get_ordering(self, queryset):
+        ordering = queryset.query.order_by
+        if not self.follow_queryset_ordering or not ordering or not all(isinstance(name, str) for name in ordering):
+            return self.ordering
+
+        pk = queryset.model._meta.pk.name
+
+        keys = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            if name == 'pk':
+                name = pk
+
+            keys.append('-' + name if descending else name)
+            if name == pk:
+                return tuple(keys)
+
+        # The primary key breaks ties, in the direction of the last key so that a `(key, pk)` index serves both
+        return tuple(keys) + ('-' + pk if keys[-1].startswith('-') else pk,)
+
+    @staticmethod
+    def _get_field(queryset, name):
+        try:
+            return queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return queryset.query.annotations[name].output_field
+
+    @staticmethod
+    def _order_by(name, field, larger):
+        if not field.null:
+            return name if larger else '-' + name
+
+        return F(name).asc(nulls_last=True) if larger else F(name).desc(nulls_first=True)
+
+    @staticmethod
+    def _beyond(name, field, value, larger):
+        """
+        Condition for values of a key coming after `value`, when going towards larger or smaller values.
+        """
+        if larger:
+            if value is None:
+                return Q(pk__in=[])
+
+            condition = Q(**{name + '__gt': value})
+            return condition | Q(**{name + '__isnull': True}) if field.null else condition
+
+        if value is None:
+            return Q(**{name + '__isnull': False})
+
+        return Q(**{name + '__lt': value})
+
+    def _seek_filter(self, position):
+        # (a, b, c) > (x, y, z)  <=>  a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+        condition = Q()
+        equal = Q()
+        for (name, descending), field, value in zip(self.keys, self.fields, position):
+            condition |= equal & self._beyond(name, field, value, larger=descending == self.reverse)
+            equal &= Q(**{name + '__isnull': True}) if value is None else Q(**{name: value})
+
+        return condition
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            position = [field.to_python(value) for field, value in zip(self.fields, cursor['p'])]
+            if len(position) != len(self.fields):
+                raise ValueError
+            reverse = bool(cursor['r'])
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+        return position, reverse
+
+    def _get_position(self, obj):
+        for (name, descending), field in zip(self.keys, self.fields):
+            if isinstance(obj, dict):
+                value = obj[name]
+            else:
+                value = getattr(obj, name if name in self.annotations else field.attname)
+
+            if isinstance(value, (datetime.date, datetime.time)):
+                yield value.isoformat()
+            elif value is None or isinstance(value, (int, float, str)):
+                yield value
+            else:
+                yield str(value)
+
+    def encode_cursor(self, obj, reverse):
+        cursor = {
+            'p': list(self._get_position(obj)),
+            'r': int(reverse),
+        }
+        encoded = b64encode(json.dumps(cursor, separators=(',', ':')).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        links = [
+            '<{}>; rel="{}"'.format(url, rel)
+            for url, rel in ((self.get_next_link(), 'next'), (self.get_previous_link(), 'prev'))
+            if url is not None
+        ]
+
+        headers = {'Link': ', '.join(links)} if links else None
+        return Response(data, headers=headers)
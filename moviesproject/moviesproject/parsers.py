@@ -0,0 +1,25 @@
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONParser(JSONParser):
+    """
+    Parses JSON request bodies with orjson, which only accepts UTF-8.
+    """
+
+    def __init__(self):
+        if orjson is None:
+            raise ImproperlyConfigured('{} requires the orjson package'.format(type(self).__name__))
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - {}'.format(exc))
@@ -0,0 +1,64 @@
+import json
+
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list as newline delimited JSON, one item per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    encoder_class = encoders.JSONEncoder
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        if not isinstance(data, list):
+            data = [data]
+
+        return b''.join(self.render_item(item) for item in data)
+
+    def render_item(self, item):
+        line = json.dumps(item, cls=self.encoder_class, ensure_ascii=False, separators=(',', ':'))
+        return line.encode('utf-8') + b'\n'
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Renders JSON with orjson, several times faster than the standard library.
+
+    Types orjson does not support natively (`Decimal`, lazy translations, ...)
+    are encoded the same way as by `JSONRenderer`.
+    """
+
+    def __init__(self):
+        if orjson is None:
+            raise ImproperlyConfigured('{} requires the orjson package'.format(type(self).__name__))
+
+        self.default = self.encoder_class().default
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        # Aware UTC datetimes end with `Z` like in `JSONRenderer`
+        option = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=self.default, option=option)
+
+        # Line and paragraph separators are escaped like in `JSONRenderer`, they end JavaScript string literals
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
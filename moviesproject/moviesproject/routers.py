@@ -0,0 +1,57 @@
+import contextlib
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+# Alias of the replica the reads of the current request go to, `None` reads from the primary
+_replica = ContextVar('replica', default=None)
+
+PIN_COOKIE_NAME = 'db_primary'
+
+
+@contextlib.contextmanager
+def use_replica(alias):
+    """
+    Routes the reads made inside the block to the `alias` database, writes keep going to the primary.
+    """
+    token = _replica.set(alias)
+    try:
+        yield
+    finally:
+        _replica.reset(token)
+
+
+def is_pinned(request):
+    return PIN_COOKIE_NAME in request.COOKIES
+
+
+def pin_to_primary(response):
+    """
+    Keeps the client reading from the primary for a while, so that it sees its own writes
+    even when the replicas lag behind.
+    """
+    if settings.DATABASE_REPLICAS:
+        response.set_cookie(PIN_COOKIE_NAME, '1', max_age=settings.DATABASE_REPLICA_PIN_SECONDS, httponly=True)
+
+    return response
+
+
+class ReplicaRouter(object):
+    """
+    Sends reads made inside `use_replica()` to the replica, everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive the schema through replication
+        return db not in settings.DATABASE_REPLICAS
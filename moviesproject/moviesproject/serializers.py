@@ -0,0 +1,100 @@
+from collections import defaultdict
+
+from rest_framework import fields as serializer_fields
+from rest_framework.serializers import ListSerializer
+
+
+class SparseFieldsetSerializerMixin(object):
+    """
+    Serializes only the fields named in the `fields` argument, leaving out
+    those named in `exclude`.
+    """
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        for name in list(self.fields):
+            if (fields is not None and name not in fields) or (exclude is not None and name in exclude):
+                self.fields.pop(name)
+
+
+class ValuesSerializer(object):
+    """
+    Read-only fast path producing the representation of a model serializer
+    from `values()` rows, without instantiating models.
+
+    Values of fields whose representation is the database value itself are
+    copied as they are, the other fields still go through their
+    `to_representation()`. Nested list serializers of reverse relations are
+    filled in with one query per relation. Fields must have plain attribute
+    sources.
+    """
+    passthrough_fields = (
+        serializer_fields.BooleanField,
+        serializer_fields.CharField,
+        serializer_fields.FloatField,
+        serializer_fields.IntegerField,
+    )
+
+    def __init__(self, serializer, model):
+        self.model = model
+        self.entries = []
+        self.relations = []
+
+        for name, field in serializer.fields.items():
+            if isinstance(field, ListSerializer):
+                relation = model._meta.get_field(field.source)
+                child = type(self)(field.child, relation.related_model)
+                self.relations.append((name, relation, child))
+                self.entries.append((name, None, None))
+            elif type(field) in self.passthrough_fields:
+                self.entries.append((name, field.source, None))
+            else:
+                self.entries.append((name, field.source, field.to_representation))
+
+    @property
+    def columns(self):
+        """
+        Columns the rows passed to `to_representation()` must contain.
+        """
+        columns = [source for name, source, convert in self.entries if source is not None]
+        if self.relations:
+            columns.append(self.model._meta.pk.attname)
+        return columns
+
+    def get_related(self, rows):
+        related = {}
+        if not self.relations:
+            return related
+
+        pks = [row[self.model._meta.pk.attname] for row in rows]
+
+        for name, relation, child in self.relations:
+            fk = relation.field.attname
+            grouped = related[name] = defaultdict(list)
+
+            related_rows = list(
+                relation.related_model._default_manager.filter(**{fk + '__in': pks}).values(fk, *child.columns)
+            )
+            for related_row, data in zip(related_rows, child.to_representation(related_rows)):
+                grouped[related_row[fk]].append(data)
+
+        return related
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        related = self.get_related(rows)
+        pk = self.model._meta.pk.attname
+
+        data = []
+        for row in rows:
+            item = {}
+            for name, source, convert in self.entries:
+                if source is None:
+                    item[name] = related[name].get(row[pk], [])
+                else:
+                    value = row[source]
+                    item[name] = value if convert is None or value is None else convert(value)
+            data.append(item)
+
+        return data
@@ -45,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'moviesproject.timing.TimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +75,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'moviesproject.wsgi.application'
 
+# Await OMDB in `POST /movies/` instead of blocking a worker, set by `moviesproject.asgi`
+MOVIES_ASYNC_CREATE = os.environ.get('MOVIES_ASYNC_CREATE', '') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
@@ -89,6 +93,46 @@ DATABASES = {
     }
 }
 
+# Read replicas of the primary, given as comma separated hosts sharing its name and credentials.
+# List actions read from a random one, see `moviesproject.routers`
+
+DATABASE_REPLICAS = []
+for index, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    alias = 'replica_{}'.format(index)
+    DATABASES[alias] = dict(DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['moviesproject.routers.ReplicaRouter']
+
+# Clients read from the primary for this long after a write, longer than the replication lag
+DATABASE_REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Local memory cache evicts least recently used entries above MAX_ENTRIES,
+    # point it to a shared backend (file, Redis, ...) with the environment variables
+    'omdb': {
+        'BACKEND': os.environ.get('OMDB_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('OMDB_CACHE_LOCATION', 'omdb'),
+        'TIMEOUT': int(os.environ.get('OMDB_CACHE_TIMEOUT', 24 * 60 * 60)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('OMDB_CACHE_MAX_ENTRIES', 10000)),
+        },
+    },
+    # Shared backend is needed for invalidation to reach all workers
+    'top_movies': {
+        'BACKEND': os.environ.get('TOP_MOVIES_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('TOP_MOVIES_CACHE_LOCATION', 'top-movies'),
+        'TIMEOUT': int(os.environ.get('TOP_MOVIES_CACHE_TIMEOUT', 60 * 60)),
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -129,7 +173,63 @@ USE_TZ = True
 STATIC_URL = '/static/'
 
 
+# Logging
+# https://docs.djangoproject.com/en/2.2/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        # One line with the timings of every request when set to INFO
+        'moviesproject.timing': {
+            'handlers': ['console'],
+            'level': os.environ.get('TIMING_LOG_LEVEL', 'WARNING'),
+        },
+    },
+}
+
+
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_FILTER_BACKENDS': ('django_filters.rest_framework.DjangoFilterBackend',)
 }
+
+# Encodes and decodes JSON with orjson instead of the standard library
+if os.environ.get('API_ORJSON'):
+    REST_FRAMEWORK.update({
+        'DEFAULT_RENDERER_CLASSES': (
+            'moviesproject.renderers.ORJSONRenderer',
+            'rest_framework.renderers.BrowsableAPIRenderer',
+        ),
+        'DEFAULT_PARSER_CLASSES': (
+            'moviesproject.parsers.ORJSONParser',
+            'rest_framework.parsers.FormParser',
+            'rest_framework.parsers.MultiPartParser',
+        ),
+    })
+
+
+# OMDB client settings
+OMDB_CACHE_ALIAS = 'omdb'
+OMDB_NOT_FOUND_CACHE_TIMEOUT = int(os.environ.get('OMDB_NOT_FOUND_CACHE_TIMEOUT', 10 * 60))
+
+OMDB_CONNECT_TIMEOUT = float(os.environ.get('OMDB_CONNECT_TIMEOUT', 3.05))
+OMDB_READ_TIMEOUT = float(os.environ.get('OMDB_READ_TIMEOUT', 10))
+OMDB_RETRIES = int(os.environ.get('OMDB_RETRIES', 2))
+OMDB_RETRY_BACKOFF = float(os.environ.get('OMDB_RETRY_BACKOFF', 0.3))
+OMDB_POOL_SIZE = int(os.environ.get('OMDB_POOL_SIZE', 10))
+
+
+# Top movies response cache
+TOP_MOVIES_CACHE_ALIAS = 'top_movies'
+
+
+# Bulk movie import settings
+MOVIES_IMPORT_WORKERS = int(os.environ.get('MOVIES_IMPORT_WORKERS', 8))
+MOVIES_IMPORT_BATCH_SIZE = int(os.environ.get('MOVIES_IMPORT_BATCH_SIZE', 100))
+MOVIES_BULK_CREATE_MAX_TITLES = 1000
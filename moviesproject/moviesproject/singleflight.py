@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import weakref
+
+
+class _Call(object):
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def result(self):
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class SingleFlight(object):
+    """
+    Lets concurrent calls with the same key share a single execution.
+
+    `do` returns the result together with a flag telling whether it was
+    shared with another caller, exceptions are propagated to all callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, function, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            return call.result(), True
+
+        try:
+            call.value = function(*args, **kwargs)
+        except BaseException as exception:
+            call.error = exception
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.value, False
+
+
+class AsyncSingleFlight(object):
+    """
+    `SingleFlight` for coroutines running in the same event loop.
+    """
+
+    def __init__(self):
+        self._calls = weakref.WeakKeyDictionary()
+
+    async def do(self, key, function, *args, **kwargs):
+        calls = self._calls.setdefault(asyncio.get_event_loop(), {})
+
+        future = calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future), True
+
+        future = calls[key] = asyncio.ensure_future(function(*args, **kwargs))
+        try:
+            return await asyncio.shield(future), False
+        finally:
+            if calls.get(key) is future:
+                del calls[key]
@@ -0,0 +1,166 @@
+import contextlib
+import contextvars
+import logging
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from .metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar('timings', default=None)
+
+REQUEST_DURATION = Histogram(
+    'http_request_phase_duration_seconds',
+    'Time spent in the phases of HTTP requests, "total" covers the whole request',
+    labelnames=('route', 'method', 'phase')
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Number of database queries made by HTTP requests',
+    labelnames=('route', 'method'),
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+)
+
+
+class Timings(object):
+    """
+    Seconds spent in the phases of a request, and the number of its database queries.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.db_queries = 0
+
+    @contextlib.contextmanager
+    def measure(self, phase):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[phase] += time.perf_counter() - start
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        self.db_queries += 1
+        with self.measure('db'):
+            return execute(sql, params, many, context)
+
+
+def measure(phase):
+    """
+    Adds the time spent in the block to `phase` of the current request.
+
+    Phases may overlap, e.g. serialization includes the queries it triggers.
+    """
+    timings = _current.get()
+    if timings is None:
+        return contextlib.nullcontext()
+
+    return timings.measure(phase)
+
+
+class TimingMiddleware(object):
+    """
+    Records where the time of every request goes: database queries, OMDB
+    calls, serialization and rendering.
+
+    The timings are sent in the `Server-Timing` header, logged and observed
+    in histograms exposed by `moviesproject.metrics.metrics_view`.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timings = Timings()
+        token = _current.set(timings)
+
+        try:
+            with timings.measure('total'), contextlib.ExitStack() as stack:
+                self.wrap_connections(stack, timings)
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        self.report(request, response, timings)
+        return response
+
+    async def __acall__(self, request):
+        timings = Timings()
+        token = _current.set(timings)
+
+        try:
+            with timings.measure('total'), contextlib.ExitStack() as stack:
+                # Connections are per thread, queries run in the thread of `sync_to_async` rather than the event loop
+                await sync_to_async(self.wrap_connections)(stack, timings)
+                try:
+                    response = await self.get_response(request)
+                finally:
+                    await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+
+        self.report(request, response, timings)
+        return response
+
+    @staticmethod
+    def wrap_connections(stack, timings):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timings.execute_wrapper))
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns, right after this hook
+        timings = _current.get()
+        if timings is not None:
+            start = time.perf_counter()
+
+            def rendered(response):
+                timings.durations['render'] += time.perf_counter() - start
+
+            response.add_post_render_callback(rendered)
+
+        return response
+
+    def report(self, request, response, timings):
+        match = request.resolver_match
+        route = match.view_name if match is not None else ''
+
+        durations = {'db': 0.0, **timings.durations}
+
+        response['Server-Timing'] = ', '.join(
+            '{};dur={:.1f}'.format(phase, duration * 1e3) + (
+                ';desc="{} queries"'.format(timings.db_queries) if phase == 'db' else ''
+            )
+            for phase, duration in durations.items()
+        )
+
+        for phase, duration in durations.items():
+            REQUEST_DURATION.observe(duration, route=route, method=request.method, phase=phase)
+        REQUEST_DB_QUERIES.observe(timings.db_queries, route=route, method=request.method)
+
+        logger.info(
+            'method=%s route=%s status=%s db_queries=%d %s',
+            request.method, route, response.status_code, timings.db_queries,
+            ' '.join('{}_ms={:.1f}'.format(phase, duration * 1e3) for phase, duration in durations.items()),
+            extra={
+                'method': request.method,
+                'route': route,
+                'status': response.status_code,
+                'db_queries': timings.db_queries,
+                'durations_ms': {phase: round(duration * 1e3, 3) for phase, duration in durations.items()},
+            }
+        )
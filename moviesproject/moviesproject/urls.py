@@ -13,12 +13,23 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.urls import path, include
 
 from .api import router
+from .metrics import metrics_view
 
 
+api_urls = router.urls
+
+if settings.MOVIES_ASYNC_CREATE:
+    from moviesapp.async_views import movie_list_create
+
+    # Takes precedence over the route of the movies viewset
+    api_urls = [path('movies/', movie_list_create, name='movie-list')] + api_urls
+
 app_name = 'moviesproject'
 urlpatterns = [
-    path('', include((router.urls, 'moviesproject'), namespace='api')),
+    path('', include((api_urls, 'moviesproject'), namespace='api')),
+    path('metrics', metrics_view, name='metrics'),
 ]
@@ -30,6 +30,15 @@ GRANT ALL PRIVILEGES ON DATABASE ${DB_NAME} TO ${DB_USER};
 COMMIT;
 SQL
 
+
+# Extensions used by migrations have to be created by a superuser, template1 covers test databases
+for database in ${DB_NAME} template1; do
+    ${RUN_PSQL} --dbname="${database}" <<SQL
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+COMMIT;
+SQL
+done
+
 sed -i -e"s/^#port = 5432.*$/port = ${DB_PORT}/" /var/lib/postgresql/data/postgresql.conf
 sed -i -e"s/^host    all             all             127.0.0.1\\/32            trust.*$/host    all             all             0.0.0.0\\/32            trust/" /var/lib/postgresql/data/pg_hba.conf
 